@@ -1,7 +1,10 @@
 import json
+import threading
 from pathlib import Path
 from typing import Set, Dict, List, Tuple, Optional, Any
 
+from shared.atomic_write import atomic_write_json
+
 
 # Employer
 def load_employers() -> Dict[str, List[str]]:
@@ -28,23 +31,74 @@ def save_employers(employers: Dict[str, List[str]]) -> None:
 
 def update_employers(jobs: list) -> None:
     """Update employers set with new companies and locations from job results."""
-    employers = load_employers()
-    
-    for job in jobs:
-        company = job.get('employer_name')
-        location = job.get('location')
-        
-        if not company or not location:
-            continue
-            
-        if company not in employers:
-            employers[company] = []
-            
-        if location not in employers[company]:
-            employers[company].append(location)
-            employers[company].sort()  # Keep locations sorted
-            
-    save_employers(employers)
+    registry = EmployerRegistry()
+    registry.update(jobs)
+    registry.flush()
+
+class EmployerRegistry:
+    """
+    In-memory employer registry that batches writes to employers.json.
+
+    Loads the file once, keeps each employer's locations as a set, and only
+    rewrites the file (atomically, in the same sorted format save_employers
+    produces) on flush() or every checkpoint_interval updates.
+    """
+
+    def __init__(self, employer_path: Optional[Path] = None, checkpoint_interval: Optional[int] = None):
+        """
+        Args:
+            employer_path: Path to employers.json. If None, uses default path.
+            checkpoint_interval: Flush after this many update() calls (None flushes only on demand)
+        """
+        self.employer_path = employer_path or Path(__file__).parent / "employers.json"
+        self.checkpoint_interval = checkpoint_interval
+        self.employers = self._load(self.employer_path)
+        self._dirty = False
+        self._updates_since_flush = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load(employer_path: Path) -> Dict[str, Set[str]]:
+        try:
+            with open(employer_path, 'r') as f:
+                data = json.load(f)
+                return {emp["name"]: set(emp["locations"]) for emp in data["employers"]}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def update(self, jobs: list) -> None:
+        """Record companies and locations from job results, flushing on checkpoints."""
+        with self._lock:
+            for job in jobs:
+                company = job.get('employer_name')
+                location = job.get('location')
+                
+                if not company or not location:
+                    continue
+
+                locations = self.employers.setdefault(company, set())
+                if location not in locations:
+                    locations.add(location)
+                    self._dirty = True
+
+            self._updates_since_flush += 1
+            checkpoint = (self.checkpoint_interval and
+                          self._updates_since_flush >= self.checkpoint_interval)
+        if checkpoint:
+            self.flush()
+
+    def flush(self) -> None:
+        """Atomically write employers.json if anything changed since the last flush."""
+        with self._lock:
+            self._updates_since_flush = 0
+            if not self._dirty:
+                return
+            sorted_employers = [
+                {"name": name, "locations": sorted(locations)}
+                for name, locations in sorted(self.employers.items())
+            ]
+            atomic_write_json(self.employer_path, {"employers": sorted_employers}, indent=2)
+            self._dirty = False
 
 def normalize_employer_name(employer_name: str) -> str:
     """Normalize employer name for consistent comparison."""
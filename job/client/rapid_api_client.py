@@ -1,4 +1,5 @@
 import sys
+import threading
 from pathlib import Path
 import requests
 from typing import Dict, Any, Optional
@@ -7,15 +8,42 @@ from job.credentials.credentials import RAPID_API_KEY
 # Add project root to Python path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
+from shared.rate_limiter import HostRateLimiter
+from shared.response_cache import ResponseCache
+from shared.client.http_transport import HttpTransport, get_transport
+
+# Cache modes: use cached responses when fresh, always re-query, or never query
+CACHE_MODES = ("default", "refresh", "cache_only")
+
 class JobSearchClient:
     """Client for interacting with the JSearch RapidAPI."""
     
-    def __init__(self):
+    def __init__(self,
+                 rate_limiter: Optional[HostRateLimiter] = None,
+                 cache: Optional[ResponseCache] = None,
+                 cache_mode: str = "default",
+                 transport: Optional[HttpTransport] = None):
+        """
+        Args:
+            rate_limiter: Optional limiter shared by every thread using this client
+            cache: Optional on-disk response cache placed in front of the API
+            cache_mode: "default", "refresh" (skip cached reads) or "cache_only" (never call the API)
+            transport: Pooled HTTP transport (defaults to the shared one)
+        """
+        if cache_mode not in CACHE_MODES:
+            raise ValueError(f"cache_mode must be one of: {CACHE_MODES}")
         self.base_url = "https://jsearch.p.rapidapi.com/search"
         self.headers = {
             "X-RapidAPI-Key": RAPID_API_KEY,
             "X-RapidAPI-Host": "jsearch.p.rapidapi.com"
         }
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.cache_mode = cache_mode
+        self.api_calls = 0
+        # Guards api_calls, which is incremented from every search thread
+        self._lock = threading.Lock()
+        self.transport = transport or get_transport()
 
     def search_jobs(self, 
                    query: str,
@@ -44,14 +72,34 @@ class JobSearchClient:
             "date_posted": date_posted
         }
 
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key(self.base_url, querystring)
+            if self.cache_mode != "refresh":
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            if self.cache_mode == "cache_only":
+                print(f"Cache miss in cache-only mode, skipping query: {query}")
+                return None
+
+        if self.rate_limiter:
+            self.rate_limiter.wait(self.headers["X-RapidAPI-Host"])
+
+        with self._lock:
+            self.api_calls += 1
+
         try:
-            response = requests.get(
+            response = self.transport.get(
                 self.base_url,
                 headers=self.headers,
                 params=querystring
             )
             response.raise_for_status()  # Raise an exception for bad status codes
-            return response.json()
+            data = response.json()
+            if cache_key:
+                self.cache.set(cache_key, data)
+            return data
         except requests.exceptions.RequestException as e:
             print(f"Error making API request: {e}")
             return None 
\ No newline at end of file
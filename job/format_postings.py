@@ -1,8 +1,15 @@
 import json
 import os
+import hashlib
+import random
+import re
+from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+from shared.atomic_write import atomic_write_json
 
 def load_job_file(job_file):
     """Load and parse a single job file."""
@@ -24,6 +31,13 @@ def format_job(job):
         'url': job.get('url', '#')
     }
 
+def posting_fingerprint(job):
+    """Stable hash of a posting's normalized company, location, title and description."""
+    key = '\0'.join(
+        job[field].lower() for field in ('company', 'location', 'title', 'description')
+    )
+    return hashlib.md5(key.encode()).hexdigest()
+
 def is_duplicate_posting(job1, job2, similarity_threshold=0.85):
     """
     Compare two job postings to determine if they are duplicates.
@@ -34,47 +48,296 @@ def is_duplicate_posting(job1, job2, similarity_threshold=0.85):
         job1['location'].lower() == job2['location'].lower()):
         
         # Compare titles
-        title_similarity = SequenceMatcher(None, 
+        title_matcher = SequenceMatcher(None, 
             job1['title'].lower(), 
             job2['title'].lower()
-        ).ratio()
+        )
+        # quick_ratio() is an upper bound on ratio(), so skip the full comparison when it can't pass
+        if title_matcher.quick_ratio() <= similarity_threshold:
+            return False
+        title_similarity = title_matcher.ratio()
         
         # Compare descriptions, but only if titles are similar
         if title_similarity > similarity_threshold:
-            desc_similarity = SequenceMatcher(None, 
+            desc_matcher = SequenceMatcher(None, 
                 job1['description'].lower(), 
                 job2['description'].lower()
-            ).ratio()
+            )
+            if desc_matcher.quick_ratio() <= similarity_threshold:
+                return False
+            desc_similarity = desc_matcher.ratio()
             
             # Consider jobs duplicate if both title and description are very similar
             return desc_similarity > similarity_threshold
     
     return False
 
-def remove_duplicates(jobs):
-    """Remove duplicate job postings from a list of jobs."""
-    unique_jobs = []
-    
-    for job in jobs:
-        # Check if this job is a duplicate of any job we've already kept
-        is_duplicate = any(
-            is_duplicate_posting(job, existing_job) 
-            for existing_job in unique_jobs
+class PostingIndex:
+    """
+    Blocked MinHash-LSH index of kept job postings.
+
+    Postings are blocked on lowercased company+location, the only pairs
+    is_duplicate_posting can ever match. Small blocks are verified
+    exhaustively; once a block grows past exact_block_size, only postings
+    sharing an LSH band bucket (built from word shingles of title and
+    description) are verified with is_duplicate_posting.
+    """
+
+    _PRIME = (1 << 61) - 1
+
+    def __init__(self,
+                 similarity_threshold: float = 0.85,
+                 num_perm: int = 32,
+                 bands: int = 8,
+                 shingle_size: int = 3,
+                 exact_block_size: int = 50,
+                 seed: int = 1):
+        """
+        Args:
+            similarity_threshold: Threshold passed through to is_duplicate_posting
+            num_perm: Number of MinHash permutations per signature
+            bands: Number of LSH bands (num_perm must be divisible by bands)
+            shingle_size: Number of words per shingle
+            exact_block_size: Blocks up to this size skip LSH and compare every pair
+            seed: Seed for the MinHash permutations
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.similarity_threshold = similarity_threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.exact_block_size = exact_block_size
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, self._PRIME), rng.randrange(0, self._PRIME))
+            for _ in range(num_perm)
+        ]
+        self._blocks = {}
+        self.stats = {
+            'postings': 0,
+            'kept': 0,
+            'exact_duplicates': 0,
+            'near_duplicates': 0,
+            'pairs_compared': 0,
+            'naive_pairs': 0,
+            'seeded': 0
+        }
+
+    @staticmethod
+    def block_key(job: Dict) -> tuple:
+        """Blocking key matching the company/location check in is_duplicate_posting."""
+        return (job['company'].lower(), job['location'].lower())
+
+    def _shingles(self, job: Dict) -> set:
+        """Word shingles of the normalized title and description."""
+        words = re.findall(r'\w+', f"{job['title']} {job['description']}".lower())
+        if len(words) < self.shingle_size:
+            return {' '.join(words)}
+        return {
+            ' '.join(words[i:i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+
+    def _signature(self, job: Dict) -> tuple:
+        """MinHash signature over the posting's shingles."""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+            for shingle in self._shingles(job)
+        ]
+        return tuple(
+            min((a * h + b) % self._PRIME for h in hashes)
+            for a, b in self._perms
         )
-        
-        if not is_duplicate:
-            unique_jobs.append(job)
-    
+
+    def _band_keys(self, signature: tuple) -> List[tuple]:
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    def _index_posting(self, block: Dict, position: int, signature: tuple) -> None:
+        for band_key in self._band_keys(signature):
+            block['buckets'][band_key].append(position)
+
+    def _candidates(self, block: Dict, job: Dict) -> List[Dict]:
+        """Return the kept postings in this block that need verification."""
+        if len(block['jobs']) <= self.exact_block_size:
+            return block['jobs']
+
+        # Block just outgrew exhaustive comparison; index what it already holds
+        if block['buckets'] is None:
+            block['buckets'] = defaultdict(list)
+            for position, kept in enumerate(block['jobs']):
+                self._index_posting(block, position, self._signature(kept))
+
+        job['_signature'] = self._signature(job)
+        positions = set()
+        for band_key in self._band_keys(job['_signature']):
+            positions.update(block['buckets'].get(band_key, ()))
+        return [block['jobs'][position] for position in sorted(positions)]
+
+    def add(self, job: Dict) -> bool:
+        """
+        Add a posting to the index unless it duplicates one already kept.
+
+        Returns:
+            True if the posting was kept, False if it was a duplicate
+        """
+        self.stats['postings'] += 1
+        block = self._block(job)
+        # The old linear scan compared each posting against every posting kept so far
+        self.stats['naive_pairs'] += self.stats['kept']
+
+        # Identical normalized text always has a similarity ratio of 1.0
+        fingerprint = posting_fingerprint(job)
+        if fingerprint in block['fingerprints'] and self.similarity_threshold < 1:
+            self.stats['exact_duplicates'] += 1
+            return False
+
+        for candidate in self._candidates(block, job):
+            self.stats['pairs_compared'] += 1
+            if is_duplicate_posting(job, candidate, self.similarity_threshold):
+                self.stats['near_duplicates'] += 1
+                job.pop('_signature', None)
+                return False
+
+        self._insert(block, job, fingerprint, job.pop('_signature', None))
+        return True
+
+    def seed(self, job: Dict) -> None:
+        """Insert a posting already known to be unique (e.g. from a previous run) without verifying it."""
+        block = self._block(job)
+        self._insert(block, job, posting_fingerprint(job), None)
+        self.stats['seeded'] += 1
+
+    def _block(self, job: Dict) -> Dict:
+        return self._blocks.setdefault(
+            self.block_key(job),
+            {'jobs': [], 'fingerprints': set(), 'buckets': None}
+        )
+
+    def _insert(self, block: Dict, job: Dict, fingerprint: str, signature: Optional[tuple]) -> None:
+        block['jobs'].append(job)
+        block['fingerprints'].add(fingerprint)
+        if block['buckets'] is not None:
+            self._index_posting(block, len(block['jobs']) - 1, signature or self._signature(job))
+        self.stats['kept'] += 1
+
+    def report(self) -> str:
+        """Summarize how much work the blocking and LSH saved."""
+        stats = self.stats
+        return (
+            f"Dedupe: {stats['postings']} postings in {len(self._blocks)} blocks, "
+            f"kept {stats['kept'] - stats['seeded']} ({stats['exact_duplicates']} exact, "
+            f"{stats['near_duplicates']} near duplicates), "
+            f"compared {stats['pairs_compared']} pairs "
+            f"(exhaustive would compare {stats['naive_pairs']})"
+        )
+
+def remove_duplicates(jobs, similarity_threshold=0.85, index: Optional[PostingIndex] = None):
+    """
+    Remove duplicate job postings from a list of jobs.
+
+    Args:
+        jobs: List of formatted job postings, in priority order
+        similarity_threshold: Threshold passed through to is_duplicate_posting
+        index: Optional PostingIndex to reuse (e.g. with tuned LSH settings)
+
+    Returns:
+        List of postings that are not duplicates of an earlier posting
+    """
+    if index is None:
+        index = PostingIndex(similarity_threshold=similarity_threshold)
+    unique_jobs = [job for job in jobs if index.add(job)]
+    print(index.report())
     return unique_jobs
 
-def generate_jobs_data():
-    """Generate consolidated jobs data JSON file."""
+def file_digest(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(manifest_file):
+    """Load the job_results manifest, or an empty one if missing or unreadable."""
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'files': {}}
+
+def scan_job_files(jobs_dir, manifest):
+    """
+    Bring the manifest up to date with the job_results directory.
+
+    Files whose mtime and size are unchanged reuse their cached records; files
+    whose content hash is unchanged only get their stat refreshed; everything
+    else is re-parsed and re-formatted.
+
+    Args:
+        jobs_dir: Directory containing per-location job JSON files
+        manifest: Manifest from a previous run (updated in place)
+
+    Returns:
+        Tuple of (file names in glob order, added, changed, removed)
+    """
+    cached_files = manifest.setdefault('files', {})
+    names, added, changed = [], [], []
+
+    for job_file in jobs_dir.glob('*.json'):
+        name = job_file.name
+        names.append(name)
+        stat = job_file.stat()
+        entry = cached_files.get(name)
+
+        if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+            continue
+
+        digest = file_digest(job_file)
+        if entry and entry['sha256'] == digest:
+            entry['mtime'], entry['size'] = stat.st_mtime, stat.st_size
+            continue
+
+        records = [format_job(job) for job in load_job_file(job_file)]
+        cached_files[name] = {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'sha256': digest,
+            'records': records,
+            'fingerprints': [posting_fingerprint(job) for job in records]
+        }
+        (changed if entry else added).append(name)
+
+    removed = sorted(set(cached_files) - set(names))
+    for name in removed:
+        del cached_files[name]
+
+    return names, added, changed, removed
+
+def generate_jobs_data(similarity_threshold=0.85, incremental=False):
+    """
+    Generate consolidated jobs data JSON file.
+
+    In incremental mode only new or changed job_results files are re-parsed.
+    When files were only added, their postings are deduplicated against the
+    existing job_data.json and merged into it; a changed or removed file
+    triggers a rebuild from the cached per-file records.
+
+    Args:
+        similarity_threshold: Title/description similarity above which postings are duplicates
+        incremental: Reuse the manifest of previously parsed files
+    """
     # Get the current script's directory
     current_dir = Path(__file__).parent
     
     # Define paths relative to the script location
     jobs_dir = current_dir / 'job_results'
     output_file = current_dir / 'job_data.json'
+    manifest_file = current_dir / 'job_data_manifest.json'
     
     # Ensure the job_results directory exists
     if not jobs_dir.exists():
@@ -82,16 +345,46 @@ def generate_jobs_data():
         jobs_dir.mkdir(parents=True, exist_ok=True)
         return
     
-    # Process all job files
-    all_jobs = []
-    for job_file in jobs_dir.glob('*.json'):
-        job_data = load_job_file(job_file)
-        formatted_jobs = [format_job(job) for job in job_data]
-        all_jobs.extend(formatted_jobs)
+    # Process all job files, reusing cached records where possible
+    manifest = load_manifest(manifest_file) if incremental else {'files': {}}
+    names, added, changed, removed = scan_job_files(jobs_dir, manifest)
+    if incremental:
+        print(f"Job files: {len(added)} new, {len(changed)} changed, {len(removed)} removed, "
+              f"{len(names) - len(added) - len(changed)} unchanged")
+
+    existing_jobs = load_job_file(output_file) if incremental and output_file.exists() else None
+
+    if existing_jobs is not None and not (added or changed or removed):
+        atomic_write_json(manifest_file, manifest, ensure_ascii=False)
+        print(f"Job data file is up to date at {output_file}")
+        return
+
+    if existing_jobs is not None and not (changed or removed):
+        # Only new files: merge their postings into the already deduplicated output
+        index = PostingIndex(similarity_threshold=similarity_threshold)
+        known_fingerprints = set()
+        for job in existing_jobs:
+            index.seed(job)
+            known_fingerprints.add(posting_fingerprint(job))
+
+        new_jobs = []
+        for name in added:
+            entry = manifest['files'][name]
+            new_jobs.extend(
+                job for job, fingerprint in zip(entry['records'], entry['fingerprints'])
+                if fingerprint not in known_fingerprints
+            )
+        merged_jobs = remove_duplicates(new_jobs, index=index)
+        print(f"Merged {len(merged_jobs)} new postings into existing job data")
+        unique_jobs = existing_jobs + merged_jobs
+    else:
+        all_jobs = []
+        for name in names:
+            all_jobs.extend(manifest['files'][name]['records'])
 
-    # Remove duplicates before sorting
-    unique_jobs = remove_duplicates(all_jobs)
-    print(f"Removed {len(all_jobs) - len(unique_jobs)} duplicate postings")
+        # Remove duplicates before sorting
+        unique_jobs = remove_duplicates(all_jobs, similarity_threshold=similarity_threshold)
+        print(f"Removed {len(all_jobs) - len(unique_jobs)} duplicate postings")
 
     # Sort jobs by date (newest first), handling missing dates
     unique_jobs.sort(
@@ -100,8 +393,8 @@ def generate_jobs_data():
     )
     
     # Write the combined job data to a JSON file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(unique_jobs, f, ensure_ascii=False, indent=2)
+    atomic_write_json(output_file, unique_jobs, ensure_ascii=False, indent=2)
+    atomic_write_json(manifest_file, manifest, ensure_ascii=False)
     
     print(f"Generated job data file with {len(unique_jobs)} jobs at {output_file}")
 
@@ -133,5 +426,4 @@ def save_filtered_jobs(filtered_jobs, modality, location):
     output_dir.mkdir(exist_ok=True)
     
     output_file = output_dir / f"{modality.lower()}_{location.replace(', ', '_').lower()}.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(unique_jobs, f, ensure_ascii=False, indent=2)
+    atomic_write_json(output_file, unique_jobs, ensure_ascii=False, indent=2)
@@ -1,17 +1,22 @@
 import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import json
 import os
+import re
 import csv
 import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Add project root to Python path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from job.client.rapid_api_client import JobSearchClient
+from shared.rate_limiter import HostRateLimiter
+from shared.response_cache import ResponseCache
 from employer.employer import (
-    update_employers, 
+    EmployerRegistry, 
     load_excluded_employers,
     load_employer_map,
     normalize_employer_name,
@@ -19,11 +24,173 @@ from employer.employer import (
 )
 from location.location import get_state_from_location
 
+# Terms that indicate a PRN/per-diem position
+PRN_TERMS = ["prn", "per diem", "as needed", "pro re nata", "p.r.n.", "perdiem", "per-diem"]
+
+# Terms that strongly indicate a travel position
+TRAVEL_TERMS = [
+    "Job Type Travel",
+    "Job Type: Travel",
+    "locum position",
+    "locum tenens",
+    "locums position",
+    "required regular travel",
+    "travel agencies",
+    "travel assignment",
+    "travel basis",
+    "travel career",
+    "travel contract",
+    "travel experience",
+    "travel experiences",
+    "travel healthcare",
+    "travel interventional",
+    "travel job",
+    "travel opportunities",
+    "travel opportunity",
+    "travel position",
+    "travel tech",
+    "traveling professional",
+    "traveling professionals",
+    "traveling tech"
+]
+
+# Terms that might indicate a travel position if they appear alone in the title
+BASIC_TRAVEL_TERMS = [
+    "locum",
+    "locums",
+    "traveler",
+    "traveling",
+    "travel"
+]
+
+# Terms that indicate it's NOT a travel position
+NON_TRAVEL_INDICATORS = [
+    "limited travel",
+    "minimal travel",
+    "no travel",
+    "no traveling",
+    "travel hub",
+    "travel is not",
+    "travel not"
+]
+
+# Title terms that indicate a contract/temporary position
+CONTRACT_TERMS = ["contract", "temporary"]
+
+FULLTIME_TYPES = {"FULLTIME", "FULL_TIME", "FULL-TIME", "FULL-TIME AND PART-TIME"}
+
+def compile_terms(terms: List[str]) -> re.Pattern:
+    """Compile substring terms into one case-insensitive alternation, longest first."""
+    unique_terms = sorted({term.lower() for term in terms}, key=len, reverse=True)
+    return re.compile("|".join(re.escape(term) for term in unique_terms))
+
+class JobFilterEngine:
+    """
+    Single-pass rule engine behind ImagingJobSearch.filter_results.
+
+    Each keyword rule is compiled once into a combined regex, each job's
+    title and description are lowercased once, and every enabled rule is
+    evaluated in one pass over the jobs. A job is rejected by the first
+    failing rule in RULE_LABELS order, which reproduces the removal counts
+    of applying the filters one after another.
+    """
+
+    RULE_LABELS = {
+        "excluded_employer": "Excluded employers",
+        "min_salary": "Salary",
+        "employment_type": "Employment type",
+        "prn": "PRN",
+        "travel": "Travel",
+        "contract": "Contract"
+    }
+
+    def __init__(self, excluded_employers: set):
+        self.excluded_employers = excluded_employers
+        self.prn_pattern = compile_terms(PRN_TERMS)
+        self.travel_title_pattern = compile_terms(TRAVEL_TERMS + BASIC_TRAVEL_TERMS)
+        self.travel_description_pattern = compile_terms(TRAVEL_TERMS)
+        self.non_travel_pattern = compile_terms(NON_TRAVEL_INDICATORS)
+        self.contract_pattern = compile_terms(CONTRACT_TERMS)
+
+    def apply(self,
+              jobs: List[Dict[str, Any]],
+              min_salary: Optional[float] = None,
+              employment_type: Optional[str] = None,
+              exclude_prn: bool = False,
+              exclude_travel: bool = False,
+              exclude_contract: bool = False) -> Tuple[List[Dict[str, Any]], Dict[str, int], Dict[str, int]]:
+        """
+        Evaluate the enabled rules against every job in a single pass.
+
+        Returns:
+            Tuple of (kept jobs, jobs removed per rule, jobs matched per rule).
+            Only enabled rules appear in the count dictionaries.
+        """
+        enabled = {
+            "excluded_employer": bool(self.excluded_employers),
+            "min_salary": bool(min_salary),
+            "employment_type": bool(employment_type),
+            "prn": exclude_prn,
+            "travel": exclude_travel,
+            "contract": exclude_contract
+        }
+        removed = {rule: 0 for rule, on in enabled.items() if on}
+        hits = dict(removed)
+        kept = []
+
+        for job in jobs:
+            title = str(job.get("job_title", "")).lower()
+            description = str(job.get("job_description", "")).lower()
+            failed = []
+
+            if enabled["excluded_employer"]:
+                if normalize_employer_name(job.get("employer_name", "")) in self.excluded_employers:
+                    failed.append("excluded_employer")
+            if enabled["min_salary"]:
+                if not (job.get("job_min_salary") and float(job["job_min_salary"]) >= min_salary):
+                    failed.append("min_salary")
+            if enabled["employment_type"]:
+                if str(job.get("job_employment_type", "")).upper() not in FULLTIME_TYPES:
+                    failed.append("employment_type")
+            if enabled["prn"]:
+                if self.prn_pattern.search(title) or self.prn_pattern.search(description):
+                    failed.append("prn")
+            if enabled["travel"]:
+                if not self.non_travel_pattern.search(description) and (
+                    self.travel_title_pattern.search(title) or
+                    self.travel_description_pattern.search(description)
+                ):
+                    failed.append("travel")
+            if enabled["contract"]:
+                if self.contract_pattern.search(title):
+                    failed.append("contract")
+
+            for rule in failed:
+                hits[rule] += 1
+            if failed:
+                removed[failed[0]] += 1
+            else:
+                kept.append(job)
+
+        return kept, removed, hits
+
 class ImagingJobSearch:
     """Specialized job search class for medical imaging positions."""
     
-    def __init__(self):
-        self.client = JobSearchClient()
+    def __init__(self,
+                 rate_limiter: Optional[HostRateLimiter] = None,
+                 cache: Optional[ResponseCache] = None,
+                 cache_mode: str = "default",
+                 employer_checkpoint_interval: Optional[int] = None):
+        """
+        Args:
+            rate_limiter: Optional per-host limiter for concurrent searches
+            cache: Optional on-disk response cache for JSearch queries
+            cache_mode: "default", "refresh" or "cache_only" (see JobSearchClient)
+            employer_checkpoint_interval: Flush employers.json every N modality searches
+                (None writes it only when flush_employers() is called)
+        """
+        self.client = JobSearchClient(rate_limiter=rate_limiter, cache=cache, cache_mode=cache_mode)
         self.output_dir = "job_results"
         self.job_types = {
             "cat_scan": ["CT Technologist", "CAT Scan Technician", "CT Tech"],
@@ -35,6 +202,8 @@ class ImagingJobSearch:
         self.max_retries = 3
         self.excluded_employers = load_excluded_employers()
         self.employer_map = load_employer_map()
+        self.employer_registry = EmployerRegistry(checkpoint_interval=employer_checkpoint_interval)
+        self.job_filter = JobFilterEngine(self.excluded_employers)
         os.makedirs(self.output_dir, exist_ok=True)
 
     def _generate_csv_filename(self, modality: str, location: str) -> str:
@@ -79,61 +248,60 @@ class ImagingJobSearch:
                 row = {field: job.get(field, '') for field in fields}
                 writer.writerow(row)
 
-    def search_by_modality(self, 
-                          modality: str,
-                          location: str = "",
-                          page: int = 1,
-                          num_pages: int = 1) -> Optional[List[Dict[str, Any]]]:
-        """Search for jobs by specific imaging modality with retry logic."""
-        if modality not in self.job_types:
-            raise ValueError(f"Invalid modality. Must be one of: {list(self.job_types.keys())}")
-
-        search_terms = self.job_types[modality]
-        all_results = []
-
-        for term in search_terms:
-            query = f"{term} {location}".strip()
-            
-            # Add retry logic
-            for attempt in range(self.max_retries):
-                try:
-                    results = self.client.search_jobs(
-                        query=query,
-                        page=page,
-                        num_pages=num_pages
-                    )
-                    
-                    if results and "data" in results:
-                        # Process each job to ensure location is properly set
-                        for job in results["data"]:
-                            if job_state := job.get('job_state'):
-                                # Set the location field for employer tracking
-                                job['location'] = job_state
-                            elif location:
-                                # If no job_state but location was provided in search
-                                job['location'] = get_state_from_location(location)
-                            
-                        all_results.extend(results["data"])
-                    break  # Success - exit retry loop
-                    
-                except Exception as e:
-                    wait_time = (2 ** attempt)  # Exponential backoff: 1, 2, 4 seconds
-                    
-                    if attempt < self.max_retries - 1:  # Don't log on last attempt
-                        error_type = str(e)
-                        if "429" in error_type:
-                            print(f"Rate limit exceeded. Waiting {wait_time} seconds before retry {attempt + 1}/{self.max_retries}")
-                        elif "500" in error_type:
-                            print(f"Server error. Waiting {wait_time} seconds before retry {attempt + 1}/{self.max_retries}")
-                        else:
-                            print(f"Error occurred: {error_type}. Waiting {wait_time} seconds before retry {attempt + 1}/{self.max_retries}")
+    def _search_term(self,
+                     term: str,
+                     location: str = "",
+                     page: int = 1,
+                     num_pages: int = 1) -> List[Dict[str, Any]]:
+        """Run a single search term query with retry logic."""
+        query = f"{term} {location}".strip()
+        term_results = []
+        
+        # Add retry logic
+        for attempt in range(self.max_retries):
+            try:
+                results = self.client.search_jobs(
+                    query=query,
+                    page=page,
+                    num_pages=num_pages
+                )
+                
+                if results and "data" in results:
+                    # Process each job to ensure location is properly set
+                    for job in results["data"]:
+                        if job_state := job.get('job_state'):
+                            # Set the location field for employer tracking
+                            job['location'] = job_state
+                        elif location:
+                            # If no job_state but location was provided in search
+                            job['location'] = get_state_from_location(location)
                         
-                        import time
-                        time.sleep(wait_time)
+                    term_results.extend(results["data"])
+                break  # Success - exit retry loop
+                
+            except Exception as e:
+                wait_time = (2 ** attempt)  # Exponential backoff: 1, 2, 4 seconds
+                
+                if attempt < self.max_retries - 1:  # Don't log on last attempt
+                    error_type = str(e)
+                    if "429" in error_type:
+                        print(f"Rate limit exceeded. Waiting {wait_time} seconds before retry {attempt + 1}/{self.max_retries}")
+                    elif "500" in error_type:
+                        print(f"Server error. Waiting {wait_time} seconds before retry {attempt + 1}/{self.max_retries}")
                     else:
-                        print(f"Failed after {self.max_retries} attempts for query: {query}")
-                        continue  # Move to next search term
+                        print(f"Error occurred: {error_type}. Waiting {wait_time} seconds before retry {attempt + 1}/{self.max_retries}")
+                    
+                    time.sleep(wait_time)
+                else:
+                    print(f"Failed after {self.max_retries} attempts for query: {query}")
 
+        return term_results
+
+    def _finalize_modality_results(self,
+                                   all_results: List[Dict[str, Any]],
+                                   modality: str,
+                                   location: str) -> Optional[List[Dict[str, Any]]]:
+        """Remap employers, record them and save the raw CSV for one modality/location."""
         if all_results:
             # Remap employer names before saving
             for job in all_results:
@@ -141,11 +309,30 @@ class ImagingJobSearch:
                     job['employer_name'] = remap_employer_name(employer_name, self.employer_map)
             
             # Only update employers if we have location information
-            update_employers(all_results)
+            self.employer_registry.update(all_results)
             self._save_to_csv(all_results, modality, location)
             
         return all_results if all_results else None
 
+    def flush_employers(self) -> None:
+        """Write buffered employer updates to employers.json."""
+        self.employer_registry.flush()
+
+    def search_by_modality(self, 
+                          modality: str,
+                          location: str = "",
+                          page: int = 1,
+                          num_pages: int = 1) -> Optional[List[Dict[str, Any]]]:
+        """Search for jobs by specific imaging modality with retry logic."""
+        if modality not in self.job_types:
+            raise ValueError(f"Invalid modality. Must be one of: {list(self.job_types.keys())}")
+
+        all_results = []
+        for term in self.job_types[modality]:
+            all_results.extend(self._search_term(term, location, page, num_pages))
+
+        return self._finalize_modality_results(all_results, modality, location)
+
     def search_all_modalities(self, 
                             location: str = "",
                             page: int = 1,
@@ -174,6 +361,49 @@ class ImagingJobSearch:
             
         return results
 
+    def search_locations_concurrently(self,
+                                      locations: List[str],
+                                      max_workers: int = 4,
+                                      page: int = 1,
+                                      num_pages: int = 1) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """
+        Search every location x modality x term combination on a bounded thread pool.
+
+        Queries are dispatched concurrently (throttled by the client's rate limiter),
+        then results are reassembled and post-processed serially in the same order
+        search_all_modalities would have produced them, so saved files are identical.
+        
+        Args:
+            locations: Locations to search (e.g. ["Denver, CO", "Aurora, CO"])
+            max_workers: Maximum number of in-flight queries
+            page: Page number to fetch
+            num_pages: Number of pages to fetch
+            
+        Returns:
+            Dictionary keyed by location, each mapping modality to list of jobs
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                (location, modality, term): executor.submit(
+                    self._search_term, term, location, page, num_pages
+                )
+                for location in locations
+                for modality, terms in self.job_types.items()
+                for term in terms
+            }
+
+            results = {}
+            for location in locations:
+                results[location] = {}
+                for modality, terms in self.job_types.items():
+                    all_results = []
+                    for term in terms:
+                        all_results.extend(futures[(location, modality, term)].result())
+                    jobs = self._finalize_modality_results(all_results, modality, location)
+                    results[location][modality] = jobs if jobs else []
+
+        return results
+
     def filter_results(self, 
                       jobs: List[Dict[str, Any]], 
                       min_salary: Optional[float] = None,
@@ -199,125 +429,20 @@ class ImagingJobSearch:
         Returns:
             Filtered list of jobs
         """
-        filtered_jobs = jobs.copy()
-        original_count = len(filtered_jobs)
+        filtered_jobs, removed, hits = self.job_filter.apply(
+            jobs,
+            min_salary=min_salary,
+            employment_type=employment_type,
+            exclude_prn=exclude_prn,
+            exclude_travel=exclude_travel,
+            exclude_contract=exclude_contract
+        )
         
-        # Update employer exclusion filter to use normalized names
-        if self.excluded_employers:
-            before_count = len(filtered_jobs)
-            filtered_jobs = [
-                job for job in filtered_jobs
-                if normalize_employer_name(job.get("employer_name", "")) not in self.excluded_employers
-            ]
-            print(f"Excluded employers filter removed {before_count - len(filtered_jobs)} jobs")
-
-        if min_salary:
-            before_count = len(filtered_jobs)
-            filtered_jobs = [
-                job for job in filtered_jobs 
-                if job.get("job_min_salary") and float(job["job_min_salary"]) >= min_salary
-            ]
-            print(f"Salary filter removed {before_count - len(filtered_jobs)} jobs")
-            
-        if employment_type:
-            before_count = len(filtered_jobs)
-            # Debug: print unique employment types
-            unique_types = set(job.get("job_employment_type", "") for job in filtered_jobs)
-            print(f"Found employment types: {unique_types}")
-            
-            filtered_jobs = [
-                job for job in filtered_jobs 
-                if str(job.get("job_employment_type", "")).upper() in ["FULLTIME", "FULL_TIME", "FULL-TIME", "FULL-TIME AND PART-TIME"]
-            ]
-            print(f"Employment type filter removed {before_count - len(filtered_jobs)} jobs")
-
-        if exclude_prn:
-            before_count = len(filtered_jobs)
-            prn_terms = ["prn", "per diem", "as needed", "pro re nata", "p.r.n.", "perdiem", "per-diem"]
-            filtered_jobs = [
-                job for job in filtered_jobs
-                if not any(term.lower() in str(job.get("job_title", "")).lower() or
-                          term.lower() in str(job.get("job_description", "")).lower()
-                          for term in prn_terms)
-            ]
-            print(f"PRN filter removed {before_count - len(filtered_jobs)} jobs")
-
-        if exclude_travel:
-            before_count = len(filtered_jobs)
-            # Terms that strongly indicate a travel position
-            travel_terms = [
-                "Job Type Travel",
-                "Job Type: Travel",
-                "locum position",
-                "locum tenens",
-                "locums position",
-                "required regular travel",
-                "travel agencies",
-                "travel assignment",
-                "travel basis",
-                "travel career",
-                "travel contract",
-                "travel experience",
-                "travel experiences",
-                "travel healthcare",
-                "travel interventional",
-                "travel job",
-                "travel opportunities",
-                "travel opportunity",
-                "travel position",
-                "travel tech",
-                "traveling professional",
-                "traveling professionals",
-                "traveling tech"
-            ]
-            # Terms that might indicate a travel position if they appear alone
-            basic_travel_terms = [
-                "locum",
-                "locums",
-                "traveler",
-                "traveling"
-            ]
+        for rule, label in JobFilterEngine.RULE_LABELS.items():
+            if rule in removed:
+                print(f"{label} filter removed {removed[rule]} jobs (matched {hits[rule]})")
             
-            # Terms that indicate it's NOT a travel position
-            non_travel_indicators = [
-                "limited travel",
-                "minimal travel",
-                "no travel",
-                "no traveling",
-                "travel hub",
-                "travel is not",
-                "travel not"
-            ]
-            
-            filtered_jobs = [
-                job for job in filtered_jobs
-                if (
-                    # Check if any non-travel indicators are present
-                    any(indicator.lower() in str(job.get("job_description", "")).lower() 
-                        for indicator in non_travel_indicators)
-                    or not (
-                        # Original travel position checks
-                        any(term.lower() in str(job.get("job_title", "")).lower() or
-                            term.lower() in str(job.get("job_description", "")).lower()
-                            for term in travel_terms) or
-                        any(term.lower() in str(job.get("job_title", "")).lower()
-                            for term in basic_travel_terms) or
-                        "travel" in str(job.get("job_title", "")).lower()
-                    )
-                )
-            ]
-            print(f"Travel filter removed {before_count - len(filtered_jobs)} jobs")
-
-        if exclude_contract:
-            before_count = len(filtered_jobs)
-            filtered_jobs = [
-                job for job in filtered_jobs
-                if not any(term.lower() in str(job.get("job_title", "")).lower() 
-                          for term in ["contract", "temporary"])
-            ]
-            print(f"Contract filter removed {before_count - len(filtered_jobs)} jobs")
-            
-        print(f"Total: Started with {original_count} jobs, ended with {len(filtered_jobs)} jobs")
+        print(f"Total: Started with {len(jobs)} jobs, ended with {len(filtered_jobs)} jobs")
         
         # Save filtered results to CSV if modality and location are provided
         if modality and location and filtered_jobs:
@@ -326,5 +451,3 @@ class ImagingJobSearch:
             self._save_to_csv(filtered_jobs, modality, location, filename=filtered_filename)
             
         return filtered_jobs
-    
-    
\ No newline at end of file
@@ -1,20 +1,26 @@
 import sys
+import argparse
 from pathlib import Path
 
 # Add project root to Python path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 from job.intake_postings import ImagingJobSearch
 from format_postings import generate_jobs_data, save_filtered_jobs
 from datetime import datetime
 from location.location import load_locations, format_location
 from shared.utility import update_last_refreshed
+from shared.rate_limiter import HostRateLimiter
+from shared.response_cache import ResponseCache
+
+CACHE_DIR = Path(__file__).parent / "cache"
 
 def process_jobs_for_location(
     job_search: ImagingJobSearch,
     location: str,
-    location_key: str
+    location_key: str,
+    all_jobs: Optional[Dict[str, List[Dict]]] = None
 ) -> None:
     """
     Process and save jobs for a specific location.
@@ -23,9 +29,11 @@ def process_jobs_for_location(
         job_search: ImagingJobSearch instance to use for searching
         location: Formatted location string for searching
         location_key: Key used for saving filtered jobs
+        all_jobs: Results already fetched for this location, keyed by modality
     """
-    print(f"\nSearching all imaging modalities in {location}...")
-    all_jobs = job_search.search_all_modalities(location=location)
+    if all_jobs is None:
+        print(f"\nSearching all imaging modalities in {location}...")
+        all_jobs = job_search.search_all_modalities(location=location)
     
     for modality, jobs in all_jobs.items():
         if not jobs:
@@ -63,26 +71,99 @@ def display_sample_jobs(jobs: List[Dict], sample_size: int = 3) -> None:
         print(f"Company: {job['employer_name']}")
         print(f"Location: {job['job_city']}, {job['job_state']}")
 
+def parse_args() -> argparse.Namespace:
+    """Parse command line options for the job pipeline."""
+    parser = argparse.ArgumentParser(description="Search and format imaging job postings.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of concurrent search queries (1 searches serially)"
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=None,
+        help="Maximum requests per second to the JSearch host"
+    )
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        "--cache-only",
+        action="store_true",
+        help="Serve searches from the response cache only; never call the API"
+    )
+    cache_group.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached responses and re-query the API (results are re-cached)"
+    )
+    cache_group.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the response cache entirely"
+    )
+    parser.add_argument(
+        "--employer-checkpoint",
+        type=int,
+        default=None,
+        help="Flush employers.json every N modality searches instead of only at the end"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-parse job_results files that changed since the last build of job_data.json"
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=24,
+        help="Hours a cached response stays fresh"
+    )
+    return parser.parse_args()
+
 def main() -> None:
     """Main function to process jobs for all configured locations."""
-    job_search = ImagingJobSearch()
+    args = parse_args()
+    rate_limiter = HostRateLimiter(args.rate_limit) if args.rate_limit else None
+    cache = None if args.no_cache else ResponseCache(CACHE_DIR, ttl_seconds=args.cache_ttl * 60 * 60)
+    cache_mode = "cache_only" if args.cache_only else "refresh" if args.refresh else "default"
+    job_search = ImagingJobSearch(
+        rate_limiter=rate_limiter,
+        cache=cache,
+        cache_mode=cache_mode,
+        employer_checkpoint_interval=args.employer_checkpoint
+    )
     metro_areas = load_locations()
     
+    # Hub city first, then its suburbs, for every metro
+    search_locations = []
     for metro in metro_areas:
-        # Process hub city
-        hub = metro["hub_city"]
-        hub_location = format_location(hub["name"], hub["state"])
-        hub_location_key = f"{hub['name']}_{hub['state']}"
-        process_jobs_for_location(job_search, hub_location, hub_location_key)
-        
-        # Process suburbs
-        for suburb in metro["suburbs"]:
-            suburb_location = format_location(suburb["name"], suburb["state"])
-            suburb_location_key = f"{suburb['name']}_{suburb['state']}"
-            process_jobs_for_location(job_search, suburb_location, suburb_location_key)
+        for place in [metro["hub_city"]] + metro["suburbs"]:
+            search_locations.append((
+                format_location(place["name"], place["state"]),
+                f"{place['name']}_{place['state']}"
+            ))
+    
+    if args.workers > 1:
+        locations = [location for location, _ in search_locations]
+        print(f"\nSearching {len(locations)} locations with {args.workers} workers...")
+        fetched = job_search.search_locations_concurrently(locations, max_workers=args.workers)
+        for location, location_key in search_locations:
+            process_jobs_for_location(job_search, location, location_key, fetched[location])
+    else:
+        for location, location_key in search_locations:
+            process_jobs_for_location(job_search, location, location_key)
+
+    # Write employer updates buffered across the whole run
+    job_search.flush_employers()
+
+    print(f"\nMade {job_search.client.api_calls} JSearch API calls")
+    print(job_search.client.transport.report())
+    if cache:
+        print(cache.report())
 
     print("\nGenerating jobs formatted data...")
-    generate_jobs_data()
+    generate_jobs_data(incremental=args.incremental)
     
     # Update the last-refreshed timestamp in index.html
     update_last_refreshed()
@@ -1,14 +1,20 @@
 import json
 from pathlib import Path
 import re
+import copy
 import hashlib
 from typing import Dict, List, Tuple, Optional
 import sys
+import os
 from pathlib import Path
 import math
 
 # Change the import to use relative path from current file location
-from shared.client.nominatim_client import RateLimitedNominatim
+from shared.client.nominatim_client import CachedGeocoder, LocalNominatim, RateLimitedNominatim
+from shared.geocode_cache import get_geocode_cache
+from shared.aho_corasick import AhoCorasickMatcher
+from shared.geodesy import haversine_km, record_coordinates
+from shared.atomic_write import atomic_write, atomic_write_json
 
 # Add project root to Python path
 project_root = str(Path(__file__).parent.parent)
@@ -70,22 +76,131 @@ STATE_MAPPING = {
     'WY': 'Wyoming'
 }
 
+# Full state name (upper case) to abbreviation mapping
+STATE_ABBREVIATIONS = {full_name.upper(): abbrev for abbrev, full_name in STATE_MAPPING.items()}
+
 # Add this after the existing imports but before other code
 _nominatim = None
+_gazetteer = None
+
+def get_nominatim_client() -> CachedGeocoder:
+    """
+    Get or create the Nominatim client singleton.
 
-def get_nominatim_client() -> RateLimitedNominatim:
-    """Get or create the Nominatim client singleton"""
+    Uses the public rate-limited API unless NOMINATIM_URL points at a local
+    Nominatim (or the fixture server), which is queried concurrently.
+    """
     global _nominatim
     if _nominatim is None:
-        _nominatim = RateLimitedNominatim(user_agent="healthcare_housing_search")
+        local_url = os.getenv("NOMINATIM_URL")
+        if local_url:
+            _nominatim = LocalNominatim(base_url=local_url, cache=get_geocode_cache())
+        else:
+            _nominatim = RateLimitedNominatim(user_agent="healthcare_housing_search", cache=get_geocode_cache())
     return _nominatim
 
+def normalize_state(state: str) -> str:
+    """Convert a state name or abbreviation to an upper-case abbreviation."""
+    state = state.strip().upper()
+    return STATE_ABBREVIATIONS.get(state, state)
+
+def normalize_city(city: str) -> str:
+    """Lower-case a city name, collapse whitespace and treat St/St. alike."""
+    city = " ".join(city.lower().split())
+    return re.sub(r'\bst\.? ', 'st. ', city)
+
+class Gazetteer:
+    """
+    Cached, indexed view of location.json.
+
+    The file is parsed once and re-read only when its mtime changes. Cities
+    are indexed by normalized (city, state abbreviation) for O(1) lookups,
+    with hub cities taking precedence over suburbs as in file order. New
+    locations added through add_suburb() are written through to both the
+    index and the file.
+    """
+
+    def __init__(self, location_path: Optional[Path] = None):
+        self.location_path = location_path or Path(__file__).parent / "location.json"
+        self._mtime = None
+        self._data = None
+        self._index = {}
+
+    def _ensure_loaded(self) -> None:
+        mtime = self.location_path.stat().st_mtime
+        if self._data is not None and mtime == self._mtime:
+            return
+        with open(self.location_path) as f:
+            self._data = json.load(f)
+        self._mtime = mtime
+        self._index = {}
+        for metro in self._data["metro_areas"]:
+            for place in [metro["hub_city"]] + metro.get("suburbs", []):
+                self._index_place(place)
+
+    def _index_place(self, place: Dict) -> None:
+        key = (normalize_city(place["name"]), normalize_state(place["state"]))
+        coords = (place["coordinates"]["lat"], place["coordinates"]["lng"])
+        self._index.setdefault(key, coords)
+
+    @property
+    def metro_areas(self) -> List[Dict]:
+        """Parsed metro_areas list (shared; copy before mutating)."""
+        self._ensure_loaded()
+        return self._data["metro_areas"]
+
+    def lookup(self, city: str, state: str) -> Optional[Tuple[float, float]]:
+        """Return (latitude, longitude) for a city and state name or abbreviation."""
+        self._ensure_loaded()
+        return self._index.get((normalize_city(city), normalize_state(state)))
+
+    def add_suburb(self, city: str, state: str, lat: float, lng: float) -> bool:
+        """
+        Add a city as a suburb of the first metro whose hub is in the same state,
+        and write location.json.
+
+        Returns:
+            True if the city was added, False if it exists or no metro matches
+        """
+        self._ensure_loaded()
+        state_abbrev = normalize_state(state)
+        if (normalize_city(city), state_abbrev) in self._index:
+            return False
+
+        found_metro = None
+        for metro in self._data["metro_areas"]:
+            if normalize_state(metro["hub_city"]["state"]) == state_abbrev:
+                found_metro = metro
+                break
+        if not found_metro:
+            return False
+
+        new_suburb = {
+            "name": city,
+            "state": state_abbrev,
+            "coordinates": {
+                "lat": lat,
+                "lng": lng
+            }
+        }
+        found_metro.setdefault("suburbs", []).append(new_suburb)
+        self._index_place(new_suburb)
+
+        atomic_write_json(self.location_path, self._data, indent=2)
+        self._mtime = self.location_path.stat().st_mtime
+        return True
+
+def get_gazetteer() -> Gazetteer:
+    """Get or create the location.json gazetteer singleton"""
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer()
+    return _gazetteer
+
 def load_locations() -> List[Dict]:
     """Load and parse the location.json file"""
-    location_path = Path(__file__).parent / "location.json"
-    with open(location_path) as f:
-        data = json.load(f)
-    return data["metro_areas"]
+    # Callers get their own copy so they can't mutate the cached gazetteer data
+    return copy.deepcopy(get_gazetteer().metro_areas)
 
 def format_location(city, state):
     """Format city and state into search string"""
@@ -125,78 +240,385 @@ def generate_id(data: Dict) -> str:
     # Create a hash of the string
     return hashlib.md5(id_string.encode()).hexdigest()[:12]
 
-def find_facility_coordinates(job_data: Dict, facilities: List[Dict]) -> Optional[Tuple[float, float]]:
+# Common healthcare system name mappings
+SYSTEM_MAPPINGS = {
+    'centura': 'commonspirit',
+    'adventhealth': 'advent',
+    'uchealth': 'uc',
+    'banner health': 'banner',
+    'healthone': 'hca',
+    'hca healthcare': 'hca',
+    'va ': 'veterans',
+}
+
+def normalize_company_name(company: str) -> str:
+    """Lowercase a company name and apply the healthcare system name mappings."""
+    company_name = company.lower()
+    for old_name, new_name in SYSTEM_MAPPINGS.items():
+        if old_name in company_name:
+            company_name = company_name.replace(old_name, new_name)
+    return company_name
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class FacilityIndex:
+    """
+    Pre-built lookup structures for matching job postings to facilities.
+
+    Built once per metro: facility names are normalized up front, a trigram
+    index narrows company-name lookups to facilities that can possibly
+    contain (or be contained in) the company name, and one Aho-Corasick
+    automaton over stripped facility names scans each job description in a
+    single pass. Company lookups are memoized per normalized company name.
+    """
+
+    # Below this many facility names, ranked substring checks beat the automaton
+    AUTOMATON_MIN_PATTERNS = 256
+
+    def __init__(self, facilities: List[Dict]):
+        self.facilities = facilities
+        # (position, lowercased name, coordinates) for named facilities, in file order
+        self._entries = []
+        self._trigram_index = {}
+        self._short_names = []
+        self._company_cache = {}
+
+        for position, facility in enumerate(facilities):
+            if not facility.get('name'):
+                continue
+            try:
+                coords = (float(facility['latitude']), float(facility['longitude']))
+            except (ValueError, KeyError, TypeError):
+                coords = None
+            name = facility['name'].lower()
+            self._entries.append((position, name, coords))
+
+            trigrams = _trigrams(name)
+            if not trigrams:
+                self._short_names.append(position)
+            for trigram in trigrams:
+                self._trigram_index.setdefault(trigram, set()).add(position)
+
+        self._entry_by_position = {entry[0]: entry for entry in self._entries}
+        self._trigram_counts = {
+            position: len(_trigrams(name)) for position, name, _ in self._entries
+        }
+
+        # Description matching prefers longer original names (stable for ties)
+        by_length = sorted(self._entries, key=lambda entry: len(facilities[entry[0]]['name']), reverse=True)
+        self._description_rank = {}
+        stripped_names = {}
+        for rank, (position, name, coords) in enumerate(by_length):
+            stripped = name.replace('hospital', '').replace('medical center', '').strip()
+            if len(stripped) < 4 or coords is None:
+                continue
+            stripped_names.setdefault(stripped, []).append(rank)
+            self._description_rank[rank] = coords
+        self._stripped_patterns = list(stripped_names)
+        self._pattern_ranks = [min(stripped_names[pattern]) for pattern in self._stripped_patterns]
+        # Small metros are faster with C-level substring checks in priority order
+        self._ranked_patterns = sorted(zip(self._pattern_ranks, self._stripped_patterns))
+        self._matcher = (AhoCorasickMatcher(self._stripped_patterns)
+                         if len(self._stripped_patterns) > self.AUTOMATON_MIN_PATTERNS else None)
+
+    def match_company(self, company_name: str) -> Optional[Tuple[float, float]]:
+        """
+        Find the first facility whose name contains, or is contained in, the normalized company name.
+        """
+        if company_name in self._company_cache:
+            return self._company_cache[company_name]
+
+        company_trigrams = _trigrams(company_name)
+        if company_trigrams:
+            # Facilities containing the company name have every one of its trigrams
+            candidate_sets = [self._trigram_index.get(trigram, set()) for trigram in company_trigrams]
+            candidates = set.intersection(*candidate_sets)
+
+            # Facility names inside the company name only have trigrams from it
+            shared_counts = {}
+            for trigram in company_trigrams:
+                for position in self._trigram_index.get(trigram, ()):
+                    shared_counts[position] = shared_counts.get(position, 0) + 1
+            candidates.update(
+                position for position, count in shared_counts.items()
+                if count == self._trigram_counts[position]
+            )
+            candidates.update(self._short_names)
+        else:
+            candidates = self._entry_by_position.keys()
+
+        result = None
+        for position in sorted(candidates):
+            _, name, coords = self._entry_by_position[position]
+            if coords and (company_name in name or name in company_name):
+                result = coords
+                break
+
+        self._company_cache[company_name] = result
+        return result
+
+    def match_description(self, description: str) -> Optional[Tuple[float, float]]:
+        """Find the longest-named facility whose stripped name appears in the description."""
+        description = description.lower()
+        if self._matcher is None:
+            for rank, pattern in self._ranked_patterns:
+                if pattern in description:
+                    return self._description_rank[rank]
+            return None
+
+        matches = self._matcher.find_all(description)
+        if not matches:
+            return None
+        best_rank = min(self._pattern_ranks[pattern_id] for pattern_id in matches)
+        return self._description_rank[best_rank]
+
+    def find(self, job_data: Dict) -> Optional[Tuple[float, float]]:
+        """Match a job posting to facility coordinates (see find_facility_coordinates)."""
+        if not job_data.get('company') or not self._entries:
+            return None
+
+        coords = self.match_company(normalize_company_name(job_data['company']))
+        if coords:
+            return coords
+
+        if job_data.get('description'):
+            return self.match_description(job_data['description'])
+        return None
+
+def find_facility_coordinates(job_data: Dict, facilities) -> Optional[Tuple[float, float]]:
     """
     Try to find facility coordinates by matching job posting details against known facilities.
     
     Args:
         job_data: Job posting data containing company and description
-        facilities: List of healthcare facilities to search through
+        facilities: FacilityIndex, or list of healthcare facilities to index and search through
         
     Returns:
         Tuple of (latitude, longitude) if match found, None otherwise
     """
-    if not job_data.get('company') or not facilities:
-        return None
-        
-    # Normalize company name for comparison
-    company_name = job_data['company'].lower()
-    
-    # Common healthcare system name mappings
-    system_mappings = {
-        'centura': 'commonspirit',
-        'adventhealth': 'advent',
-        'uchealth': 'uc',
-        'banner health': 'banner',
-        'healthone': 'hca',
-        'hca healthcare': 'hca',
-        'va ': 'veterans',
-    }
-    
-    # Apply system name mappings
-    for old_name, new_name in system_mappings.items():
-        if old_name in company_name:
-            company_name = company_name.replace(old_name, new_name)
-    
-    # First try exact company name match
-    for facility in facilities:
-        if not facility.get('name'):
-            continue
-            
-        facility_name = facility['name'].lower()
-        if company_name in facility_name or facility_name in company_name:
-            try:
-                return (float(facility['latitude']), float(facility['longitude']))
-            except (ValueError, KeyError):
-                continue
-    
-    # If no match found and we have a job description, try matching facility names in the description
-    if job_data.get('description'):
-        description = job_data['description'].lower()
-        
-        # Sort facilities by name length (longest first) to prefer more specific matches
-        sorted_facilities = sorted(facilities, 
-                                 key=lambda x: len(x.get('name', '')), 
-                                 reverse=True)
-                                 
-        for facility in sorted_facilities:
-            if not facility.get('name'):
-                continue
-                
-            # Remove common words that might cause false matches
-            facility_name = facility['name'].lower()
-            facility_name = facility_name.replace('hospital', '').replace('medical center', '').strip()
-            
-            if len(facility_name) < 4:  # Skip very short names to avoid false matches
+    if not isinstance(facilities, FacilityIndex):
+        if not job_data.get('company') or not facilities:
+            return None
+        facilities = FacilityIndex(facilities)
+    return facilities.find(job_data)
+
+def job_coordinates(job: Dict, facilities) -> Optional[Tuple[float, float]]:
+    """
+    Coordinates a job is mapped at: its matched facility's when the company
+    matches one, otherwise its own (usually the city centroid).
+
+    Args:
+        job: Job posting dictionary
+        facilities: FacilityIndex or list of facility dictionaries
+
+    Returns:
+        Tuple of (latitude, longitude), or None if the job has no usable coordinates
+    """
+    return find_facility_coordinates(job, facilities) or record_coordinates(job)
+
+class MetroPartitioner:
+    """
+    Assigns geocoded records to the metro maps they belong on.
+
+    A metro covers every point within margin_km of its hub or one of its
+    suburbs in location.json. Metro bounding boxes are indexed on a
+    lat/lon grid, so each record is only distance-checked against the
+    metros whose box touches its grid cell.
+    """
+
+    def __init__(self,
+                 metro_areas: Optional[List[Dict]] = None,
+                 margin_km: float = 25.0,
+                 cell_degrees: float = 0.5):
+        """
+        Args:
+            metro_areas: List of metro area dictionaries; if None, uses the location.json gazetteer
+            margin_km: Distance from the hub or a suburb still counted as part of the metro
+            cell_degrees: Grid cell size in degrees
+        """
+        if metro_areas is None:
+            metro_areas = get_gazetteer().metro_areas
+        self.margin_km = margin_km
+        self.cell_degrees = cell_degrees
+        self.places = {}
+        self.bounds = {}
+        self._grid = {}
+
+        margin_lat = margin_km / 111.0
+        for metro in metro_areas:
+            name = metro["hub_city"]["name"].lower()
+            points = [
+                (place["coordinates"]["lat"], place["coordinates"]["lng"])
+                for place in [metro["hub_city"]] + metro.get("suburbs", [])
+            ]
+            self.places[name] = points
+
+            lats = [lat for lat, _ in points]
+            lons = [lon for _, lon in points]
+            # A degree of longitude shrinks with latitude; pad for the widest point
+            margin_lon = margin_km / (111.0 * max(math.cos(math.radians(max(map(abs, lats)))), 0.01))
+            box = (min(lats) - margin_lat, min(lons) - margin_lon, max(lats) + margin_lat, max(lons) + margin_lon)
+            self.bounds[name] = box
+
+            min_row, min_col = self._cell(box[0], box[1])
+            max_row, max_col = self._cell(box[2], box[3])
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    self._grid.setdefault((row, col), []).append(name)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def metros_for(self, lat: float, lon: float) -> List[str]:
+        """Return the names (lowercase hub city) of every metro covering a point."""
+        metros = []
+        for name in self._grid.get(self._cell(lat, lon), ()):
+            min_lat, min_lon, max_lat, max_lon = self.bounds[name]
+            if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
                 continue
-                
-            if facility_name in description:
-                try:
-                    return (float(facility['latitude']), float(facility['longitude']))
-                except (ValueError, KeyError):
-                    continue
+            if any(haversine_km(lat, lon, place_lat, place_lon) <= self.margin_km
+                   for place_lat, place_lon in self.places[name]):
+                metros.append(name)
+        return metros
+
+    def partition(self, records: List[Dict], label: str = "records") -> Dict[str, List[Dict]]:
+        """
+        Split records by metro. A record near two metros is assigned to both;
+        records without coordinates or outside every metro are dropped.
+
+        Args:
+            records: Dictionaries with latitude and longitude keys
+            label: Name of the records for the summary line
+
+        Returns:
+            Dictionary mapping every metro name to its records
+        """
+        assigned = {name: [] for name in self.places}
+        unassigned = 0
+        for record in records:
+            coords = record_coordinates(record)
+            metros = self.metros_for(*coords) if coords else []
+            if not metros:
+                unassigned += 1
+            for name in metros:
+                assigned[name].append(record)
+
+        counts = ", ".join(f"{name.title()} {len(items)}" for name, items in assigned.items())
+        print(f"Partitioned {len(records)} {label}: {counts}, {unassigned} outside every metro")
+        return assigned
+
+# How generate_map hands marker data to the page: one JS statement per marker,
+# a compact payload inlined once, the same payload in a cacheable sidecar file,
+# or fetched per viewport from the spatial index service (runner-spatial.py)
+MAP_PAYLOAD_MODES = ("markers", "inline", "sidecar", "viewport")
+
+DEFAULT_SPATIAL_ENDPOINT = "http://localhost:8089"
+
+MARKER_ICONS_JS = """
+    var BuildingIcon = L.Icon.extend({
+        options: {
+            iconSize: [32, 32],
+            iconAnchor: [16, 32],
+            popupAnchor: [0, -32]
+        }
+    });
     
-    return None
+    var careBuilding = new BuildingIcon({iconUrl: 'icon/hospital.png'});
+    var houseBuilding = new BuildingIcon({iconUrl: 'icon/house.png'});
+    var rentalBuilding = new BuildingIcon({iconUrl: 'icon/rental.png'});
+    var jobBuilding = new BuildingIcon({iconUrl: 'icon/job.png'});
+    """
+
+def _js_escape(value: str) -> str:
+    """Double escape a string for a single- or double-quoted JavaScript literal."""
+    return value.replace('"', '\\"').replace("'", "\\'")
+
+def render_marker_js(layers: Dict[str, List[Dict]]) -> str:
+    """
+    Render map layers as one L.marker statement per point.
+
+    Args:
+        layers: Layer name (hospitals, houses, rentals, jobs) to marker records
+
+    Returns:
+        JavaScript defining the icons, markers, layer groups and overlayMaps
+    """
+    markers = [MARKER_ICONS_JS]
+    for layer in ("hospitals", "houses", "rentals", "jobs"):
+        for marker in layers[layer]:
+            if layer == "hospitals":
+                icon = "careBuilding"
+                popup = _js_escape(marker["name"])
+            elif layer == "jobs":
+                icon = "jobBuilding"
+                popup = (f"<a href=\\'{_js_escape(marker['url'])}\\' target=\\'_blank\\'>"
+                         f"{_js_escape(marker['title'])}<br>{_js_escape(marker['company'])}</a>")
+            else:
+                icon = "rentalBuilding" if layer == "rentals" else "houseBuilding"
+                popup = f"<a href=\\'{_js_escape(marker['url'])}\\' target=\\'_blank\\'>${marker['price']}</a>"
+            markers.append(f"""
+            var marker_{marker['id']} = L.marker([{marker['lat']}, {marker['lon']}], {{icon: {icon}}})
+                .bindPopup("{popup}");
+            """)
+
+    for layer in ("hospitals", "houses", "rentals", "jobs"):
+        names = sorted(f"marker_{marker['id']}" for marker in layers[layer])
+        markers.append(f"var {layer} = L.layerGroup([{', '.join(names)}]);")
+
+    markers.append("""
+    var overlayMaps = {
+        "Care Facilities": hospitals,
+        "Houses": houses,
+        "Rentals": rentals,
+        "Jobs": jobs
+    };
+    """)
+    return '\n'.join(markers)
+
+def build_map_payload(layers: Dict[str, List[Dict]]) -> Dict:
+    """
+    Pack map layers into the compact array format read by shared/map_layers.js.
+
+    Each layer is a list of rows with coordinates rounded to 5 decimal
+    places (about 1 m):
+        hospitals: [lat, lon, name]
+        houses, rentals: [lat, lon, price, url]
+        jobs: [lat, lon, title, company, url]
+    URLs are stored without the prefix they all share within a layer; the
+    prefixes are listed once under "url_prefixes".
+    """
+    def point(marker):
+        return [round(marker['lat'], 5), round(marker['lon'], 5)]
+
+    url_prefixes = {}
+    for layer in ("houses", "rentals", "jobs"):
+        urls = [marker['url'] for marker in layers[layer]]
+        url_prefixes[layer] = os.path.commonprefix(urls) if len(urls) > 1 else ""
+
+    def url(layer, marker):
+        return marker['url'][len(url_prefixes[layer]):]
+
+    return {
+        "url_prefixes": url_prefixes,
+        "hospitals": [point(m) + [m['name']] for m in layers["hospitals"]],
+        "houses": [point(m) + [m['price'], url("houses", m)] for m in layers["houses"]],
+        "rentals": [point(m) + [m['price'], url("rentals", m)] for m in layers["rentals"]],
+        "jobs": [point(m) + [m['title'], m['company'], url("jobs", m)] for m in layers["jobs"]]
+    }
+
+def render_payload_js(source: str, loader: str = "loadMapLayers") -> str:
+    """
+    JavaScript that declares the layer groups the templates expect and fills
+    them with a shared/map_layers.js loader from a payload object literal or
+    a URL string.
+    """
+    return (
+        "var hospitals = L.layerGroup(), houses = L.layerGroup(), "
+        "rentals = L.layerGroup(), jobs = L.layerGroup();\n"
+        f"    {loader}({{hospitals: hospitals, houses: houses, rentals: rentals, jobs: jobs}}, "
+        f"{source});"
+    )
 
 def generate_map(
     city: str,
@@ -204,7 +626,9 @@ def generate_map(
     output_path: Path,
     residences: List[Dict],
     facilities: List[Dict],
-    jobs: List[Dict]
+    jobs: List[Dict],
+    payload: str = "inline",
+    spatial_endpoint: str = DEFAULT_SPATIAL_ENDPOINT
 ) -> None:
     """
     Generate an interactive map for a city using the provided data.
@@ -216,49 +640,21 @@ def generate_map(
         residences: List of residence data
         facilities: List of healthcare facility data
         jobs: List of job posting data
+        payload: One of MAP_PAYLOAD_MODES. "inline" embeds one compact JSON
+            payload in the page, "sidecar" writes it to <city>.data.json next
+            to the page, "markers" emits one JavaScript statement per marker and
+            "viewport" loads only the markers in view from spatial_endpoint
+        spatial_endpoint: Base URL of the spatial index service for "viewport" maps
     """
-    # Delete existing map file for this city
-    map_dir = Path(__file__).parent / "map"
-    city_map = map_dir / f"{city.lower()}.html"
-    
-    try:
-        if city_map.exists():
-            city_map.unlink()
-            # Verify deletion completed
-            while city_map.exists():
-                continue
-            print(f"Deleted existing map: {city_map.name}")
-    except Exception as e:
-        print(f"Warning: Could not delete {city_map.name}: {e}")
-        # If we can't delete the file, we should not proceed
-        raise
-
-    # Ensure file is deleted before proceeding
-    if city_map.exists():
-        raise RuntimeError(f"Could not delete existing map file for {city}")
+    if payload not in MAP_PAYLOAD_MODES:
+        raise ValueError(f"payload must be one of {MAP_PAYLOAD_MODES}, got {payload!r}")
 
     # Read template
     with open(template_path) as f:
         template = f.read()
     
-    # Generate marker JavaScript
-    markers = []
-    
-    # Add icon definitions
-    markers.append("""
-    var BuildingIcon = L.Icon.extend({
-        options: {
-            iconSize: [32, 32],
-            iconAnchor: [16, 32],
-            popupAnchor: [0, -32]
-        }
-    });
-    
-    var careBuilding = new BuildingIcon({iconUrl: 'icon/hospital.png'});
-    var houseBuilding = new BuildingIcon({iconUrl: 'icon/house.png'});
-    var rentalBuilding = new BuildingIcon({iconUrl: 'icon/rental.png'});
-    var jobBuilding = new BuildingIcon({iconUrl: 'icon/job.png'});
-    """)
+    # Marker records per layer, rendered below in the requested payload mode
+    layers = {"hospitals": [], "houses": [], "rentals": [], "jobs": []}
 
     # Track used IDs and coordinates to prevent duplicates and overlaps
     used_ids = set()
@@ -315,12 +711,12 @@ def generate_map(
             # Apply coordinate adjustment
             adj_lat, adj_lon = get_adjusted_coordinates(facility['latitude'], facility['longitude'])
             
-            # Double escape the name for JavaScript string
-            name = facility['name'].replace('"', '\\"').replace("'", "\\'")
-            markers.append(f"""
-            var marker_{facility['id']} = L.marker([{adj_lat}, {adj_lon}], {{icon: careBuilding}})
-                .bindPopup("{name}");
-            """)
+            layers["hospitals"].append({
+                "id": facility['id'],
+                "lat": adj_lat,
+                "lon": adj_lon,
+                "name": facility['name']
+            })
         except KeyError as e:
             print(f"Warning: Skipping facility due to missing data: {e}")
             continue
@@ -358,38 +754,34 @@ def generate_map(
             adj_lat, adj_lon = get_adjusted_coordinates(residence['latitude'], residence['longitude'])
                 
             price = "{:,.0f}".format(float(residence['price']))
-            icon = 'rentalBuilding' if residence.get('type') == 'rent' else 'houseBuilding'
-            
-            # Double escape the URL for JavaScript string
-            url = residence['url'].replace('"', '\\"').replace("'", "\\'")
-            popup = f"<a href=\\'{url}\\' target=\\'_blank\\'>${price}</a>"
-            
-            markers.append(f"""
-            var marker_{residence['id']} = L.marker([{adj_lat}, {adj_lon}], {{icon: {icon}}})
-                .bindPopup("{popup}");
-            """)
+            layer = 'rentals' if residence.get('type') == 'rent' else 'houses'
+            if residence.get('type') not in ('own', 'rent'):
+                # Listings of unknown type have no layer to be shown in
+                continue
+
+            layers[layer].append({
+                "id": residence['id'],
+                "lat": adj_lat,
+                "lon": adj_lon,
+                "price": price,
+                "url": residence['url']
+            })
         except (KeyError, ValueError) as e:
             print(f"Warning: Skipping residence due to invalid data: {e}")
             continue
     
+    # Index facilities once for all job lookups on this map
+    facility_index = FacilityIndex(facilities)
+
     # Add markers for jobs
     for job in jobs:
         try:
-            # First try to get coordinates from facility matching
-            facility_coords = find_facility_coordinates(job, facilities)
-            
-            if facility_coords:
-                job['latitude'], job['longitude'] = facility_coords
-            else:
-                # Convert coordinates to float if they're strings
-                try:
-                    if isinstance(job.get('latitude'), str):
-                        job['latitude'] = float(job['latitude'])
-                    if isinstance(job.get('longitude'), str):
-                        job['longitude'] = float(job['longitude'])
-                except (ValueError, TypeError):
-                    print(f"Warning: Could not convert coordinates for job: {job.get('title', 'Unknown')}")
-                    continue
+            # Prefer the matched facility's coordinates over the job's city centroid
+            coords = job_coordinates(job, facility_index)
+            if not coords:
+                print(f"Warning: Could not convert coordinates for job: {job.get('title', 'Unknown')}")
+                continue
+            job['latitude'], job['longitude'] = coords
 
             if not (all(k in job for k in ['latitude', 'longitude', 'title', 'company', 'url']) and
                    job['latitude'] is not None and 
@@ -410,79 +802,43 @@ def generate_map(
             # Apply coordinate adjustment
             adj_lat, adj_lon = get_adjusted_coordinates(job['latitude'], job['longitude'])
             
-            # Double escape all strings for JavaScript
-            title = job['title'].replace('"', '\\"').replace("'", "\\'")
-            company = job['company'].replace('"', '\\"').replace("'", "\\'")
-            url = job['url'].replace('"', '\\"').replace("'", "\\'")
-            popup = f"<a href=\\'{url}\\' target=\\'_blank\\'>{title}<br>{company}</a>"
-            
-            markers.append(f"""
-            var marker_{job['id']} = L.marker([{adj_lat}, {adj_lon}], {{icon: jobBuilding}})
-                .bindPopup("{popup}");
-            """)
+            layers["jobs"].append({
+                "id": job['id'],
+                "lat": adj_lat,
+                "lon": adj_lon,
+                "title": job['title'],
+                "company": job['company'],
+                "url": job['url']
+            })
         except KeyError as e:
             print(f"Warning: Skipping job due to missing data: {e}")
             continue
 
-    # Create layer groups with string-to-float conversion
-    facility_markers = list(set(f"marker_{f['id']}" for f in facilities 
-                              if 'id' in f and f['id'] in used_ids))
-    
-    house_markers = list(set(f"marker_{r['id']}" for r in residences 
-                           if 'id' in r and r['id'] in used_ids 
-                           and r.get('type') == 'own'))
-    
-    rental_markers = list(set(f"marker_{r['id']}" for r in residences 
-                            if 'id' in r and r['id'] in used_ids 
-                            and r.get('type') == 'rent'))
-    
-    job_markers = list(set(f"marker_{j['id']}" for j in jobs 
-                          if 'id' in j and j['id'] in used_ids))
-
-    # Sort markers for consistent ordering
-    facility_markers.sort()
-    house_markers.sort()
-    rental_markers.sort()
-    job_markers.sort()
-
-    # Add layer groups only if they have markers
-    if facility_markers:
-        markers.append(f"var hospitals = L.layerGroup([{', '.join(facility_markers)}]);")
+    output_path = Path(output_path)
+    if payload == "markers":
+        map_js = render_marker_js(layers)
+    elif payload == "viewport":
+        map_js = render_payload_js(json.dumps(f"{spatial_endpoint.rstrip('/')}/markers"), "loadViewportLayers")
     else:
-        markers.append("var hospitals = L.layerGroup([]);")
-        
-    if house_markers:
-        markers.append(f"var houses = L.layerGroup([{', '.join(house_markers)}]);")
-    else:
-        markers.append("var houses = L.layerGroup([]);")
-        
-    if rental_markers:
-        markers.append(f"var rentals = L.layerGroup([{', '.join(rental_markers)}]);")
-    else:
-        markers.append("var rentals = L.layerGroup([]);")
-        
-    if job_markers:
-        markers.append(f"var jobs = L.layerGroup([{', '.join(job_markers)}]);")
-    else:
-        markers.append("var jobs = L.layerGroup([]);")
-
-    # Create overlay maps with all layers
-    markers.append("""
-    var overlayMaps = {
-        "Care Facilities": hospitals,
-        "Houses": houses,
-        "Rentals": rentals,
-        "Jobs": jobs
-    };
-    """)
+        data = json.dumps(build_map_payload(layers), ensure_ascii=False, separators=(',', ':'))
+        if payload == "inline":
+            # Keep a "</script>" inside popup text from closing the script block
+            map_js = render_payload_js(data.replace('</', '<\\/'))
+        else:
+            sidecar_path = output_path.with_name(f"{output_path.stem}.data.json")
+            atomic_write(sidecar_path, data)
+            # Version the URL by content so browsers cache it until the data changes
+            version = hashlib.md5(data.encode('utf-8')).hexdigest()[:12]
+            map_js = render_payload_js(json.dumps(f"{sidecar_path.name}?v={version}"))
 
-    # Insert markers into template
-    marker_js = '\n'.join(markers)
-    template = template.replace('// coordinate data is inserted here', marker_js)
+    # Insert marker data into template
+    template = template.replace('// coordinate data is inserted here', map_js)
     
-    # Write output file
-    with open(output_path, 'w') as f:
-        f.write(template)
+    # Swap the map in atomically so a running http.server never sees it missing
+    if atomic_write(output_path, template):
+        print(f"Wrote map: {output_path.name}")
+    else:
+        print(f"Map unchanged: {output_path.name}")
 
 def load_facilities(metro_name: str) -> List[Dict]:
     """Load healthcare facility data for a specific metro area"""
@@ -549,13 +905,56 @@ def load_residences() -> List[Dict]:
     
     return residences
 
-def get_coordinates_from_location_local(location: str, metro_areas: List[Dict]) -> Tuple[float, float]:
+PROXIMITY_FIELDS = ("nearest_facility", "nearest_facility_miles", "jobs_nearby", "jobs_radius_miles", "proximity_score")
+
+def save_listing_proximity(annotations: Dict[str, Dict]) -> int:
+    """
+    Write proximity annotations into own_data.json and rent_data.json.
+
+    The annotations for each modality are also saved to a
+    <modality>_proximity.json sidecar, which the residence pipeline merges
+    back in whenever it re-exports the data file from its listing store.
+
+    Args:
+        annotations: Proximity fields keyed by listing URL; listings not in it
+            lose any proximity fields from an earlier run
+
+    Returns:
+        Number of listings annotated
+    """
+    annotated = 0
+    for modality in ("own", "rent"):
+        results_path = Path(__file__).parent.parent / "residence" / modality / f"{modality}_results"
+        data_path = results_path / f"{modality}_data.json"
+        try:
+            with open(data_path) as f:
+                listings = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not load {modality} listings: {e}")
+            continue
+
+        for listing in listings:
+            fields = annotations.get(listing.get('url'))
+            if fields:
+                listing.update(fields)
+                annotated += 1
+            else:
+                for field in PROXIMITY_FIELDS:
+                    listing.pop(field, None)
+        urls = {listing.get('url') for listing in listings}
+        atomic_write_json(results_path / f"{modality}_proximity.json",
+                          {url: fields for url, fields in annotations.items() if url in urls},
+                          ensure_ascii=False, indent=2, sort_keys=True)
+        atomic_write_json(data_path, listings, ensure_ascii=False, indent=2)
+    return annotated
+
+def get_coordinates_from_location_local(location: str, metro_areas: Optional[List[Dict]] = None) -> Tuple[float, float]:
     """
     Get coordinates for a location from local metro_areas data only.
     
     Args:
         location: Location string (e.g. "Denver, CO" or "Denver, Colorado")
-        metro_areas: List of metro area dictionaries from location.json
+        metro_areas: Optional list of metro area dictionaries; if None, uses the cached location.json gazetteer
         
     Returns:
         Tuple of (latitude, longitude) or None if not found
@@ -565,26 +964,16 @@ def get_coordinates_from_location_local(location: str, metro_areas: List[Dict])
         
     city, state = [part.strip() for part in location.split(',')]
     
-    # Normalize city name (handle St. vs St)
-    city = city.replace('St ', 'St. ')
-    
-    # Convert full state name to abbreviation if needed
-    state_abbrev = state
-    for abbrev, full_name in STATE_MAPPING.items():
-        if state.upper() == full_name.upper():
-            state_abbrev = abbrev
-            break
+    if metro_areas is None:
+        return get_gazetteer().lookup(city, state)
+
+    city_key, state_abbrev = normalize_city(city), normalize_state(state)
     
-    # Check hub cities
+    # Check hub cities, then suburbs
     for metro in metro_areas:
-        hub = metro["hub_city"]
-        if city.lower() == hub["name"].lower() and state_abbrev.upper() == hub["state"].upper():
-            return hub["coordinates"]["lat"], hub["coordinates"]["lng"]
-            
-        # Check suburbs
-        for suburb in metro["suburbs"]:
-            if city.lower() == suburb["name"].lower() and state_abbrev.upper() == suburb["state"].upper():
-                return suburb["coordinates"]["lat"], suburb["coordinates"]["lng"]
+        for place in [metro["hub_city"]] + metro["suburbs"]:
+            if city_key == normalize_city(place["name"]) and state_abbrev == normalize_state(place["state"]):
+                return place["coordinates"]["lat"], place["coordinates"]["lng"]
     
     return None
 
@@ -598,50 +987,9 @@ def save_to_location_json(city: str, state: str, lat: float, lng: float) -> None
         lat: Latitude
         lng: Longitude
     """
-    location_path = Path(__file__).parent / "location.json"
     try:
-        # Load current data
-        with open(location_path) as f:
-            data = json.load(f)
-            
-        # Find the appropriate metro area
-        state_full = STATE_MAPPING.get(state.upper(), state)
-        found_metro = None
-        
-        for metro in data["metro_areas"]:
-            hub_state = metro["hub_city"]["state"]
-            if hub_state == state:
-                found_metro = metro
-                break
-                
-        if found_metro:
-            # Check if city already exists
-            all_cities = ([found_metro["hub_city"]] + 
-                         found_metro.get("suburbs", []))
-            
-            for existing_city in all_cities:
-                if (existing_city["name"].lower() == city.lower() and 
-                    existing_city["state"].upper() == state.upper()):
-                    return  # City already exists, don't add duplicate
-            
-            # Add as new suburb
-            new_suburb = {
-                "name": city,
-                "state": state.upper(),
-                "coordinates": {
-                    "lat": lat,
-                    "lng": lng
-                }
-            }
-            
-            if "suburbs" not in found_metro:
-                found_metro["suburbs"] = []
-            found_metro["suburbs"].append(new_suburb)
-            
-            # Save updated data
-            with open(location_path, 'w') as f:
-                json.dump(data, f, indent=2)
-                
+        # Writes through the gazetteer so the new city is visible without a reload
+        get_gazetteer().add_suburb(city, state, lat, lng)
     except Exception as e:
         print(f"Warning: Failed to save location to JSON: {e}")
 
@@ -664,15 +1012,10 @@ def lookup_coordinates(location: str) -> Optional[Tuple[float, float]]:
     city, state = [part.strip() for part in location.split(',')]
     
     # Convert state to abbreviation if needed
-    state_abbrev = state
-    for abbrev, full_name in STATE_MAPPING.items():
-        if state.upper() == full_name.upper():
-            state_abbrev = abbrev
-            break
+    state_abbrev = normalize_state(state)
 
     # First try getting coordinates from our metro areas data
-    metro_areas = load_locations()
-    coords = get_coordinates_from_location_local(location, metro_areas)
+    coords = get_gazetteer().lookup(city, state_abbrev)
     if coords:
         return coords
         
@@ -698,6 +1041,52 @@ def lookup_coordinates(location: str) -> Optional[Tuple[float, float]]:
     
     return None
 
+def backfill_coordinates(locations: List[str]) -> int:
+    """
+    Geocode every location not yet in location.json in one batch.
+
+    Unknown "City, ST" strings are deduplicated and sent through
+    geocode_many(); any still unresolved are retried with the full state
+    name, mirroring lookup_coordinates. Hits are saved to location.json.
+
+    Args:
+        locations: Location strings (e.g. "Denver, CO" or "Denver, Colorado")
+
+    Returns:
+        Number of new locations saved
+    """
+    gazetteer = get_gazetteer()
+    unknown = {}
+    for location in locations:
+        if not location or location.count(',') != 1:
+            continue
+        city, state = [part.strip() for part in location.split(',')]
+        state_abbrev = normalize_state(state)
+        if gazetteer.lookup(city, state_abbrev) is None:
+            unknown.setdefault((normalize_city(city), state_abbrev), (city, state_abbrev))
+    if not unknown:
+        return 0
+
+    geocoder = get_nominatim_client()
+    queries = {key: f"{city}, {state_abbrev}" for key, (city, state_abbrev) in unknown.items()}
+    results = geocoder.geocode_many(queries.values())
+
+    retry = {
+        key: f"{city}, {STATE_MAPPING[state_abbrev]}, United States"
+        for key, (city, state_abbrev) in unknown.items()
+        if not results.get(queries[key]) and state_abbrev in STATE_MAPPING
+    }
+    retry_results = geocoder.geocode_many(retry.values()) if retry else {}
+
+    saved = 0
+    for key, (city, state_abbrev) in unknown.items():
+        result = results.get(queries[key]) or retry_results.get(retry.get(key))
+        if result:
+            save_to_location_json(city, state_abbrev, result.latitude, result.longitude)
+            saved += 1
+    print(f"Backfilled coordinates for {saved} of {len(unknown)} new locations")
+    return saved
+
 def load_jobs() -> List[Dict]:
     """Load job postings data and add coordinates"""
     # Look in the job directory from project root
@@ -708,6 +1097,12 @@ def load_jobs() -> List[Dict]:
         with open(job_path) as f:
             jobs = json.load(f)
         
+        # Resolve all unknown job locations in one batch before the per-job lookups
+        backfill_coordinates([
+            job['location'] for job in jobs
+            if 'location' in job and ('latitude' not in job or 'longitude' not in job)
+        ])
+        
         # Process each job
         for job in jobs:
             try:
@@ -1,48 +1,104 @@
 import sys
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Dict, List
 
 # Add project root to Python path
 sys.path.append(str(Path(__file__).parent.parent))
 
 # Import location.py directly since we're in the same directory
-from location import load_locations, load_facilities, load_residences, load_jobs, generate_map
+from location import (
+    load_locations, load_facilities, load_residences, load_jobs, generate_map,
+    MetroPartitioner, MAP_PAYLOAD_MODES, save_listing_proximity
+)
+from shared.proximity import score_listings
 from shared.utility import update_last_refreshed
+from shared.geocode_cache import get_geocode_cache
 
-def generate_maps_for_metro(metro_name: str) -> None:
+def load_shared_data() -> Dict[str, List[Dict]]:
+    """
+    Load (and geocode) the residence and job datasets shared by every metro map.
+
+    Returns:
+        Dictionary with "residences" and "jobs" lists
+    """
+    try:
+        start = time.perf_counter()
+        residences = load_residences()
+        print(f"Loaded {len(residences)} residence listings in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        print(f"Warning: Error loading residences: {e}")
+        residences = []
+
+    try:
+        start = time.perf_counter()
+        jobs = load_jobs()
+        print(f"Loaded {len(jobs)} job postings in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        print(f"Warning: Error loading jobs: {e}")
+        jobs = []
+
+    return {"residences": residences, "jobs": jobs}
+
+def score_residences(metro_names: List[str],
+                     residences_by_metro: Dict[str, List[Dict]],
+                     jobs_by_metro: Dict[str, List[Dict]],
+                     radius_miles: float) -> None:
+    """
+    Score each metro's listings against that metro's facilities and jobs and
+    write the results into the listing JSON used by the residence pages.
+    A listing covered by two metros keeps its better score.
+    """
+    start = time.perf_counter()
+    best = {}
+    for metro_name in metro_names:
+        listings = residences_by_metro.get(metro_name, [])
+        facilities = load_facilities(metro_name)
+        scores = score_listings(listings, facilities, jobs_by_metro.get(metro_name, []), radius_miles)
+        for listing, score in zip(listings, scores):
+            url = listing.get('url')
+            if not (score and url):
+                continue
+            if url not in best or score["proximity_score"] > best[url]["proximity_score"]:
+                best[url] = score
+
+    annotated = save_listing_proximity(best)
+    print(f"Scored {annotated} listings by facility and job proximity in {time.perf_counter() - start:.2f}s")
+
+def generate_maps_for_metro(metro_name: str,
+                            residences: List[Dict],
+                            jobs: List[Dict],
+                            payload: str = "inline") -> Dict[str, float]:
     """
     Generate map for a specific metropolitan area.
-    
+
     Args:
         metro_name: Name of the metropolitan area (e.g., 'denver', 'phoenix', 'minneapolis')
+        residences: Preloaded residences located in this metro
+        jobs: Preloaded, geocoded jobs located in this metro
+        payload: How marker data is embedded in the map (see MAP_PAYLOAD_MODES)
+
+    Returns:
+        Dictionary of per-stage timings in seconds for this metro
     """
     print(f"\nGenerating map for {metro_name.title()}...")
-    
+    start = time.perf_counter()
+
     # Define paths
     template_path = Path(__file__).parent / "map" / "template" / f"base-{metro_name}.html"
     output_path = Path(__file__).parent / "map" / f"{metro_name}.html"
-    
-    # Load data for markers
-    try:
-        residences = load_residences()
-        print(f"Loaded {len(residences)} residence listings")
-    except Exception as e:
-        print(f"Warning: Error loading residences: {e}")
-        residences = []
-        
+
     try:
         facilities = load_facilities(metro_name)
-        print(f"Loaded {len(facilities)} healthcare facilities")
+        print(f"Loaded {len(facilities)} healthcare facilities for {metro_name.title()}")
     except Exception as e:
         print(f"Warning: Error loading facilities: {e}")
         facilities = []
-        
-    try:
-        jobs = load_jobs()
-        print(f"Loaded {len(jobs)} job postings")
-    except Exception as e:
-        print(f"Warning: Error loading jobs: {e}")
-        jobs = []
-    
+    loaded = time.perf_counter()
+
     # Generate the map
     try:
         generate_map(
@@ -51,28 +107,83 @@ def generate_maps_for_metro(metro_name: str) -> None:
             output_path=output_path,
             residences=residences,
             facilities=facilities,
-            jobs=jobs
+            jobs=jobs,
+            payload=payload
         )
         print(f"Successfully generated map at {output_path}")
     except Exception as e:
         print(f"Error generating map for {metro_name}: {e}")
+    finished = time.perf_counter()
+
+    return {
+        "load_seconds": loaded - start,
+        "render_seconds": finished - loaded,
+        "total_seconds": finished - start
+    }
 
 def main() -> None:
     """Main function to run the location pipeline."""
+    parser = argparse.ArgumentParser(description="Generate metro maps.")
+    parser.add_argument("--map-payload", choices=MAP_PAYLOAD_MODES, default="inline",
+                        help="Embed marker data as one inline payload (default), a cached "
+                             "<metro>.data.json sidecar, or one JS statement per marker, or load "
+                             "it per viewport from runner-spatial.py")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes rendering metro maps in parallel (default: one per metro, up to the CPU count)")
+    parser.add_argument("--job-radius", type=float, default=10.0,
+                        help="Miles within which jobs count as near a listing (default: 10)")
+    args = parser.parse_args()
+
     print("Starting location pipeline...")
-    
+    pipeline_start = time.perf_counter()
+
     # Load metro areas from configuration
     metro_areas = load_locations()
-    
-    # Generate maps for each metro area
-    for metro in metro_areas:
-        metro_name = metro["hub_city"]["name"].lower()
-        generate_maps_for_metro(metro_name)
-    
+    metro_names = [metro["hub_city"]["name"].lower() for metro in metro_areas]
+
+    # Residences and jobs are the same for every metro: load and geocode them once
+    shared = load_shared_data()
+    print(get_geocode_cache().report())
+
+    # Send each metro only the records located in it. Each task receives its
+    # own pickled copy, so in-place annotations by generate_map stay per metro
+    partitioner = MetroPartitioner(metro_areas)
+    residences_by_metro = partitioner.partition(shared["residences"], "residences")
+    jobs_by_metro = partitioner.partition(shared["jobs"], "jobs")
+
+    score_residences(metro_names, residences_by_metro, jobs_by_metro, args.job_radius)
+
+    # Generate maps for each metro area in parallel
+    workers = args.workers or min(len(metro_names), os.cpu_count() or 1)
+    timings = {}
+    with ProcessPoolExecutor(max_workers=max(workers, 1)) as executor:
+        futures = {
+            executor.submit(generate_maps_for_metro,
+                            metro_name,
+                            residences_by_metro.get(metro_name, []),
+                            jobs_by_metro.get(metro_name, []),
+                            args.map_payload): metro_name
+            for metro_name in metro_names
+        }
+        for future in as_completed(futures):
+            metro_name = futures[future]
+            try:
+                timings[metro_name] = future.result()
+            except Exception as e:
+                print(f"Error generating map for {metro_name}: {e}")
+
+    print(f"\nMap timings ({workers} worker(s)):")
+    for metro_name in metro_names:
+        if metro_name in timings:
+            timing = timings[metro_name]
+            print(f"  {metro_name.title()}: {timing['total_seconds']:.2f}s "
+                  f"(facilities {timing['load_seconds']:.2f}s, render {timing['render_seconds']:.2f}s)")
+    print(f"Total pipeline time: {time.perf_counter() - pipeline_start:.2f}s")
+
     # Update the last-refreshed timestamp in index.html
     update_last_refreshed()
-    
+
     print("\nLocation pipeline complete")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,200 @@
+"""
+Spatial index service for the metro maps.
+
+Builds (or reloads) a grid-bucket index of every residence, facility and job
+and serves it on localhost:
+
+    GET /markers?bbox=south,west,north,east[&layers=houses,jobs][&limit=5000]
+        Points in a map viewport, in the compact payload format read by
+        shared/map_layers.js
+    GET /nearby?lat=..&lon=..[&radius=10][&layers=hospitals][&limit=100]
+        Points within radius miles of a location, nearest first
+    GET /stats
+        Indexed point counts per layer
+
+Usage:
+    python location/runner-spatial.py [--port 8089] [--rebuild] [--build-only]
+"""
+import sys
+import json
+import time
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List
+from urllib.parse import parse_qs, urlsplit
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Import location.py directly since we're in the same directory
+from location import (
+    load_locations, load_facilities, load_residences, load_jobs, generate_id,
+    build_map_payload, get_state_from_location, record_coordinates, job_coordinates,
+    FacilityIndex, MetroPartitioner, DEFAULT_SPATIAL_ENDPOINT
+)
+from shared.spatial_index import SpatialIndex
+
+PROJECT_ROOT = Path(__file__).parent.parent
+INDEX_PATH = Path(__file__).parent / "spatial_index.pickle"
+DEFAULT_LIMIT = 5000
+
+def index_sources() -> List[Path]:
+    """Files the index is built from; a change to any of them triggers a rebuild."""
+    sources = [
+        Path(__file__).parent / "location.json",
+        PROJECT_ROOT / "residence" / "own" / "own_results" / "own_data.json",
+        PROJECT_ROOT / "residence" / "rent" / "rent_results" / "rent_data.json",
+        PROJECT_ROOT / "job" / "job_data.json"
+    ]
+    for metro in load_locations():
+        state = get_state_from_location(f"City, {metro['hub_city']['state']}").lower()
+        sources.append(PROJECT_ROOT / "employer" / "facility" / f"facilities-{state}.json")
+    return sources
+
+def build_index() -> SpatialIndex:
+    """Build a spatial index over all residences, facilities and (geocoded) jobs."""
+    index = SpatialIndex()
+    index.sources = SpatialIndex.source_mtimes(index_sources())
+
+    for residence in load_residences():
+        coords = record_coordinates(residence)
+        layer = {"own": "houses", "rent": "rentals"}.get(residence.get('type'))
+        if not (coords and layer and residence.get('url')):
+            continue
+        try:
+            price = "{:,.0f}".format(float(residence['price']))
+        except (KeyError, TypeError, ValueError):
+            continue
+        index.add(layer, *coords, {
+            "id": residence['id'],
+            "price": price,
+            "url": residence['url']
+        })
+
+    # Jobs are placed per metro exactly as generate_map places them: at the
+    # matched facility of that metro when there is one, else the city centroid
+    metro_areas = load_locations()
+    jobs_by_metro = MetroPartitioner(metro_areas).partition(load_jobs(), "jobs")
+    seen_facilities = set()
+    seen_jobs = set()
+    for metro in metro_areas:
+        metro_name = metro["hub_city"]["name"].lower()
+        facilities = load_facilities(metro_name)
+        for facility in facilities:
+            coords = record_coordinates(facility)
+            key = (facility.get('name'), coords)
+            if not coords or key in seen_facilities:
+                continue
+            seen_facilities.add(key)
+            index.add("hospitals", *coords, {
+                "id": facility.get('id') or generate_id(facility),
+                "name": facility.get('name', '')
+            })
+
+        facility_index = FacilityIndex(facilities)
+        for job in jobs_by_metro.get(metro_name, []):
+            coords = job_coordinates(job, facility_index)
+            key = (job['id'], coords)
+            if not coords or key in seen_jobs or not all(job.get(k) for k in ('title', 'company', 'url')):
+                continue
+            seen_jobs.add(key)
+            index.add("jobs", *coords, {
+                "id": job['id'],
+                "title": job['title'],
+                "company": job['company'],
+                "url": job['url']
+            })
+
+    return index
+
+def get_index(rebuild: bool = False) -> SpatialIndex:
+    """Load the persisted index if its sources are unchanged, otherwise build and save it."""
+    start = time.perf_counter()
+    index = None if rebuild else SpatialIndex.load(INDEX_PATH, index_sources())
+    if index is not None:
+        print(f"Loaded spatial index with {len(index)} points in {time.perf_counter() - start:.2f}s")
+        return index
+
+    index = build_index()
+    index.save(INDEX_PATH)
+    print(f"Built spatial index with {len(index)} points in {time.perf_counter() - start:.2f}s")
+    return index
+
+def make_handler(index: SpatialIndex):
+    """Build a request handler class serving queries against index."""
+
+    class SpatialIndexHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, payload, status: int = 200) -> None:
+            body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            # The maps are served by a different local server
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+            layers = params["layers"].split(",") if params.get("layers") else None
+            try:
+                if parts.path == "/markers":
+                    south, west, north, east = (float(value) for value in params["bbox"].split(","))
+                    limit = int(params.get("limit", DEFAULT_LIMIT))
+                    points = index.query_bbox(south, west, north, east, layers, limit + 1)
+                    grouped = {"hospitals": [], "houses": [], "rentals": [], "jobs": []}
+                    for layer, lat, lon, record in points[:limit]:
+                        grouped[layer].append({**record, "lat": lat, "lon": lon})
+                    payload = build_map_payload(grouped)
+                    payload["truncated"] = len(points) > limit
+                    self._send_json(payload)
+                elif parts.path == "/nearby":
+                    results = index.query_radius(
+                        float(params["lat"]), float(params["lon"]),
+                        float(params.get("radius", 10)), layers,
+                        int(params.get("limit", 100))
+                    )
+                    self._send_json([
+                        {"layer": layer, "distance_miles": round(distance, 2), "lat": lat, "lon": lon, **record}
+                        for distance, layer, lat, lon, record in results
+                    ])
+                elif parts.path == "/stats":
+                    self._send_json({"points": len(index), "layers": index.layer_counts()})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+            except (KeyError, ValueError) as e:
+                self._send_json({"error": f"bad query: {e}"}, 400)
+
+        def log_message(self, format, *args):
+            pass
+
+    return SpatialIndexHandler
+
+def main() -> None:
+    default_port = urlsplit(DEFAULT_SPATIAL_ENDPOINT).port
+    parser = argparse.ArgumentParser(description="Serve viewport and radius queries over map data.")
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index even if its sources are unchanged")
+    parser.add_argument("--build-only", action="store_true", help="Build or refresh the index file and exit")
+    args = parser.parse_args()
+
+    index = get_index(rebuild=args.rebuild)
+    print(", ".join(f"{layer}: {count}" for layer, count in sorted(index.layer_counts().items())))
+    if args.build_only:
+        return
+
+    server = ThreadingHTTPServer(("localhost", args.port), make_handler(index))
+    print(f"Serving spatial queries on http://localhost:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+from typing import Any, Dict, List, Optional
+
+# Results per page observed from the zillow56 search endpoint
+DEFAULT_PAGE_SIZE = 41
+# Zillow stops serving pages past this point, however many results remain
+DEFAULT_MAX_PAGES = 20
+
+class PriceShardPlanner:
+    """
+    Query planner that searches a location completely with as few API calls
+    as possible.
+
+    A search window (location + price range) is paginated through the pages
+    the API reports (or, without a reported count, until a page comes back
+    short). When a window holds more results than the
+    API will page through, it is saturated: its price range is split in half
+    and each half is searched the same way, recursively, until every shard
+    is complete. Small windows cost a single call; dense ones are sharded
+    only as far as they need to be.
+    """
+
+    def __init__(self,
+                 client,
+                 max_pages: int = DEFAULT_MAX_PAGES,
+                 page_size: int = DEFAULT_PAGE_SIZE,
+                 min_span: int = 10):
+        """
+        Args:
+            client: ZillowClient used to fetch pages
+            max_pages: Deepest page the API serves for one search
+            page_size: Results on a full page, used when the API doesn't report resultsPerPage
+            min_span: Price windows narrower than this are not split further
+        """
+        self.client = client
+        self.max_pages = max_pages
+        self.page_size = page_size
+        self.min_span = min_span
+        self.calls = 0
+
+    def _total_pages(self, response: Dict[str, Any]) -> Optional[int]:
+        """Pages in a search as reported by the API (totalPages, or derived from the counts)."""
+        if response.get("totalPages") is not None:
+            return int(response["totalPages"])
+        total, per_page = response.get("totalResultCount"), response.get("resultsPerPage")
+        if total is not None and per_page:
+            return -(-int(total) // int(per_page))
+        return None
+
+    def _search_window(self,
+                       location: str,
+                       property_type: str,
+                       min_price: Optional[int],
+                       max_price: Optional[int],
+                       results: List[Dict[str, Any]],
+                       splittable: bool = True) -> bool:
+        """
+        Page through one price window, appending its results to results.
+
+        When the API reports the page count, exactly that many pages are
+        fetched. Otherwise paging stops at the first page shorter than
+        resultsPerPage (or page_size when that is missing too). A window
+        reported as saturated is left after its first page when it will be
+        split anyway; one that can't be split is paged through max_pages.
+
+        Returns:
+            True if the window is saturated (has more results than the API pages through)
+        """
+        response = self.client.fetch_search_page(location, property_type, min_price, max_price, 1)
+        self.calls += 1
+        page_results = response.get("results", [])
+        results.extend(page_results)
+
+        total_pages = self._total_pages(response)
+        if total_pages is not None:
+            if total_pages > self.max_pages and splittable:
+                # More results than the API will page through: split without paginating
+                return True
+            for page in range(2, min(total_pages, self.max_pages) + 1):
+                page_results = self.client.fetch_page(location, property_type, min_price, max_price, page)
+                self.calls += 1
+                if not page_results:
+                    break
+                results.extend(page_results)
+            return total_pages > self.max_pages
+
+        page_size = response.get("resultsPerPage") or self.page_size
+        page = 1
+        while page < self.max_pages and len(page_results) >= page_size:
+            page += 1
+            page_results = self.client.fetch_page(location, property_type, min_price, max_price, page)
+            self.calls += 1
+            results.extend(page_results)
+        return page >= self.max_pages and len(page_results) >= page_size
+
+    def search(self,
+               location: str,
+               property_type: str = "sale",
+               min_price: Optional[int] = None,
+               max_price: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Search a location across a price range, sharding it until complete.
+
+        A page that still fails after the client's own retries ends the
+        search, and the results gathered so far are returned with
+        "incomplete" set rather than thrown away.
+
+        Args:
+            location: City and state (e.g., "Denver, CO")
+            property_type: "sale" or "rent"
+            min_price: Lower end of the price range in USD
+            max_price: Upper end of the price range in USD (required for sharding)
+
+        Returns:
+            Dict containing:
+                - data: Property results, unique by zpid
+                - total_results: Number of results
+                - pages_retrieved: API calls made
+                - shards: Price windows searched to completion
+                - truncated_shards: Saturated windows too narrow to split further
+                - incomplete: True if the search stopped on an error
+        """
+        results = []
+        seen = set()
+        shards = []
+        truncated = []
+        incomplete = False
+        self.calls = 0
+
+        windows = [(min_price, max_price)]
+        while windows:
+            low, high = windows.pop()
+            lower = low or 0
+            splittable = high is not None and high - lower >= 2 * self.min_span
+            window_results = []
+            try:
+                saturated = self._search_window(location, property_type, low, high, window_results, splittable)
+            except Exception as e:
+                print(f"Warning: {location} search stopped at price range {low}-{high} after "
+                      f"{self.calls} request(s): {e}; keeping the results found so far")
+                incomplete = True
+                saturated = False
+
+            for result in window_results:
+                key = result.get("zpid") or id(result)
+                if key not in seen:
+                    seen.add(key)
+                    results.append(result)
+
+            if incomplete:
+                break
+            if not saturated:
+                shards.append((low, high))
+                continue
+
+            if not splittable:
+                print(f"Warning: {location} price range {low}-{high} is saturated and too narrow to split; results are truncated")
+                truncated.append((low, high))
+                continue
+
+            # Zillow's price filters are inclusive; search the upper half last
+            middle = (lower + high) // 2
+            windows.append((middle + 1, high))
+            windows.append((lower, middle))
+
+        return {
+            "data": results,
+            "total_results": len(results),
+            "pages_retrieved": self.calls,
+            "shards": shards,
+            "truncated_shards": truncated,
+            "incomplete": incomplete
+        }
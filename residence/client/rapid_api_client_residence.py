@@ -1,6 +1,6 @@
 import requests
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import os
 from pathlib import Path
 
@@ -8,12 +8,26 @@ from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
+from shared.client.http_transport import HttpTransport, get_transport
+from shared.rate_limiter import AdaptiveRateLimiter, parse_retry_after
+
 try:
     from credentials.credentials import RAPID_API_KEY
 except ImportError:
     print("Warning: Failed to import RAPID_API_KEY. Please ensure credentials.py exists.")
     RAPID_API_KEY = os.getenv("RAPID_API_KEY")
 
+# sortSelection values for the search endpoint
+DEFAULT_SORT = "priorityscore"
+NEWEST_FIRST_SORT = "days"
+
+class RateLimitError(Exception):
+    """Raised on a 429 response; retry_after holds the server's Retry-After in seconds, if any."""
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__("429: Rate limit exceeded")
+        self.retry_after = retry_after
+
 class ZillowClient:
     """
     Client for interacting with the Zillow Rapid API.
@@ -24,9 +38,17 @@ class ZillowClient:
     Attributes:
         base_url (str): The base URL for the Zillow API endpoint
         headers (dict): Headers required for API authentication
+        transport (HttpTransport): Pooled HTTP transport shared with other clients
+        rate_limiter (AdaptiveRateLimiter): Token bucket shared by every thread using this client
+        throttle_retries (int): Times a page answered with 429 is retried before giving up
+        server_retries (int): Times a page failing with a server or connection error is retried
     """
     
-    def __init__(self):
+    def __init__(self,
+                 transport: Optional[HttpTransport] = None,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 throttle_retries: int = 2,
+                 server_retries: int = 2):
         if not RAPID_API_KEY:
             raise ValueError("RAPID_API_KEY is required. Set it in credentials.py or as an environment variable.")
             
@@ -35,6 +57,133 @@ class ZillowClient:
             "X-RapidAPI-Key": RAPID_API_KEY,
             "X-RapidAPI-Host": "zillow56.p.rapidapi.com"
         }
+        self.transport = transport or get_transport()
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(requests_per_second=1.0)
+        self.throttle_retries = throttle_retries
+        self.server_retries = server_retries
+
+    def _build_querystring(self,
+                           location: str,
+                           property_type: str,
+                           min_price: Optional[int],
+                           max_price: Optional[int],
+                           page: int,
+                           sort_selection: str = DEFAULT_SORT) -> Dict[str, str]:
+        querystring = {
+            "location": location,
+            "page": str(page),
+            "output": "json",
+            "sortSelection": sort_selection,
+            "listing_type": "by_agent",
+            "doz": "any"
+        }
+        
+        # Add optional filters if provided
+        if min_price:
+            querystring["price_min"] = str(min_price)
+        if max_price:
+            querystring["price_max"] = str(max_price)
+        
+        # Add property type filter
+        if property_type.lower() == "rent":
+            querystring["status"] = "forRent"
+            # Add filters for single-family homes only
+            querystring["isMultiFamily"] = "false"
+            querystring["isApartment"] = "false"
+            querystring["isCondo"] = "false"
+            querystring["isManufactured"] = "false"
+            querystring["isTownhouse"] = "false"
+            # Add filter for pet-friendly rentals
+            querystring["onlyRentalLargeDogsAllowed"] = "true"
+        else:  # sale
+            querystring["status"] = "forSale"
+            # Add filters for single-family homes only
+            querystring["isMultiFamily"] = "false"
+            querystring["isApartment"] = "false"
+            querystring["isCondo"] = "false"
+            querystring["isManufactured"] = "false"
+            querystring["isTownhouse"] = "false"
+            querystring["home_type"] = "Houses"
+        return querystring
+
+    def fetch_search_page(self,
+                          location: str,
+                          property_type: str = "sale",
+                          min_price: Optional[int] = None,
+                          max_price: Optional[int] = None,
+                          page: int = 1,
+                          sort_selection: str = DEFAULT_SORT) -> Dict[str, Any]:
+        """
+        Fetch a single page of results, waiting on the shared rate limiter first.
+
+        A 429 slows the limiter down and the page is retried up to
+        throttle_retries times before RateLimitError is raised. Server errors
+        (5xx), timeouts and dropped connections are retried up to
+        server_retries times with exponential backoff, so a transient failure
+        costs one page rather than a whole search.
+
+        Args:
+            sort_selection: Result order (DEFAULT_SORT, or NEWEST_FIRST_SORT for newest listings first)
+
+        Returns:
+            The decoded response: "results" plus, when the API reports them,
+            "totalResultCount", "totalPages" and "resultsPerPage"
+
+        Raises:
+            RateLimitError: On a 429 (the limiter has already slowed down)
+            Exception: For other API-related errors
+        """
+        querystring = self._build_querystring(location, property_type, min_price, max_price, page, sort_selection)
+        throttles = 0
+        failures = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                response = self.transport.get(
+                    self.base_url,
+                    headers=self.headers,
+                    params=querystring
+                )
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                status = e.response.status_code if getattr(e, 'response', None) is not None else None
+                if status == 429:
+                    retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+                    self.rate_limiter.on_throttle(retry_after)
+                    if throttles < self.throttle_retries:
+                        # Retry just this page; acquire() waits out Retry-After at the reduced rate
+                        throttles += 1
+                        continue
+                    raise RateLimitError(retry_after) from e
+
+                transient = (status is not None and status >= 500) or isinstance(
+                    e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                if transient and failures < self.server_retries:
+                    failures += 1
+                    time.sleep(2 ** failures)  # 2, 4 seconds
+                    continue
+                if status == 500:
+                    raise Exception("500: Server error") from e
+                raise Exception(f"API request failed: {str(e)}") from e
+
+            self.rate_limiter.on_success(response.headers)
+            return response.json()
+
+    def fetch_page(self,
+                   location: str,
+                   property_type: str = "sale",
+                   min_price: Optional[int] = None,
+                   max_price: Optional[int] = None,
+                   page: int = 1,
+                   sort_selection: str = DEFAULT_SORT) -> List[Dict[str, Any]]:
+        """
+        Fetch a single page of results (see fetch_search_page).
+
+        Returns:
+            List of property results on the page
+        """
+        return self.fetch_search_page(location, property_type, min_price, max_price, page,
+                                      sort_selection).get("results", [])
 
     def search_properties(self,
                          location: str,
@@ -62,76 +211,17 @@ class ZillowClient:
                 
         Raises:
             ValueError: If property_type is invalid
-            Exception: For API-related errors (rate limits, server errors, etc.)
+            RateLimitError: If the API answers 429
+            Exception: For other API-related errors (server errors, etc.)
         """
         if property_type.lower() not in ["sale", "rent"]:
             raise ValueError("property_type must be either 'sale' or 'rent'")
-            
+
         all_results = []
-        
         for current_page in range(page, page + num_pages):
-            querystring = {
-                "location": location,
-                "page": str(current_page),
-                "output": "json",
-                "sortSelection": "priorityscore",
-                "listing_type": "by_agent",
-                "doz": "any"
-            }
-            
-            # Add optional filters if provided
-            if min_price:
-                querystring["price_min"] = str(min_price)
-            if max_price:
-                querystring["price_max"] = str(max_price)
-            
-            # Add property type filter
-            if property_type.lower() == "rent":
-                querystring["status"] = "forRent"
-                # Add filters for single-family homes only
-                querystring["isMultiFamily"] = "false"
-                querystring["isApartment"] = "false"
-                querystring["isCondo"] = "false"
-                querystring["isManufactured"] = "false"
-                querystring["isTownhouse"] = "false"
-                # Add filter for pet-friendly rentals
-                querystring["onlyRentalLargeDogsAllowed"] = "true"
-            else:  # sale
-                querystring["status"] = "forSale"
-                # Add filters for single-family homes only
-                querystring["isMultiFamily"] = "false"
-                querystring["isApartment"] = "false"
-                querystring["isCondo"] = "false"
-                querystring["isManufactured"] = "false"
-                querystring["isTownhouse"] = "false"
-                querystring["home_type"] = "Houses"
-            
-            try:
-                response = requests.get(
-                    self.base_url,
-                    headers=self.headers,
-                    params=querystring
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                if "results" in data:
-                    all_results.extend(data["results"])
-                
-                # Respect API rate limits
-                if current_page < page + num_pages - 1:
-                    time.sleep(1)  # Basic rate limiting between pages
-                    
-            except requests.exceptions.RequestException as e:
-                if hasattr(e, 'response') and e.response is not None:
-                    if e.response.status_code == 429:
-                        raise Exception("429: Rate limit exceeded") from e
-                    elif e.response.status_code == 500:
-                        raise Exception("500: Server error") from e
-                raise Exception(f"API request failed: {str(e)}") from e
-        
+            all_results.extend(self.fetch_page(location, property_type, min_price, max_price, current_page))
         return {
             "data": all_results,
             "total_results": len(all_results),
             "pages_retrieved": num_pages
-        } 
\ No newline at end of file
+        }
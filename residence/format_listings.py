@@ -1,21 +1,11 @@
 import json
 from datetime import datetime
 from pathlib import Path
-import csv
 import time
+from typing import Any, Dict, List, NamedTuple, Optional
 
-def load_listing_file(listing_file):
-    """Load and parse a single listing CSV file."""
-    try:
-        listings = []
-        with open(listing_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                listings.append(row)
-        return listings
-    except Exception as e:
-        print(f"Error reading {listing_file}: {str(e)}")
-        return []
+from shared.atomic_write import WriteResult, durable_write_json, verify_write
+from listing_store import get_listing_store, listed_at
 
 def format_listing(listing):
     """Format a single listing entry for the table."""
@@ -41,6 +31,7 @@ def format_listing(listing):
     # Construct Zillow URL using ZPID if available
     zpid = listing.get('zpid')
     url = f"https://www.zillow.com/homedetails/{zpid}_zpid/" if zpid else '#'
+    fetched_at = time.time()
         
     formatted = {
         'address': address,
@@ -51,8 +42,12 @@ def format_listing(listing):
         'year_built': listing.get('yearBuilt', 'N/A'),
         'description': listing.get('description', ''),
         'url': url,
+        'zpid': zpid,
+        'status': listing.get('homeStatus', ''),
         'location': f"{listing.get('city', '')}, {listing.get('state', '')}",
-        'list_date': listing.get('timeOnZillow', ''),
+        'matched_locations': listing.get('matchedLocations', []),
+        'listed_at': listed_at(listing, fetched_at),
+        'fetched_at': fetched_at,
         'primary_photo': listing.get('imgSrc', ''),
         'alt_photos': [],  # We'll need to handle additional photos differently if available
         'latitude': listing.get('latitude', None),  # Extract latitude
@@ -62,105 +57,141 @@ def format_listing(listing):
     #print(f"Successfully formatted listing for: {formatted['address']}")
     return formatted
 
-def generate_listings_data(modality):
+class SavedListings(NamedTuple):
+    """Formatted listings saved for one location, and the file they were written to."""
+    listings: List[Dict[str, Any]]
+    file: Optional[WriteResult]
+
+def results_dir(modality):
+    """Directory holding the per-location and combined JSON files for a modality."""
+    return Path(__file__).parent / f"{modality}/{modality}_results"
+
+def read_listing_file(path):
+    """
+    Read one per-location JSON file written by save_filtered_listings.
+
+    Older files have no per-record fetch time; their records get the file's
+    modification time, which is when they were fetched.
     """
-    Generate consolidated listings data JSON file for a specific modality.
-    If called, there is an expectation that there are listings to process.
-    Logic is added to deal with moderate filesystem latency.
+    with open(path, 'r', encoding='utf-8') as f:
+        listings = json.load(f)
+    written_at = Path(path).stat().st_mtime
+    for listing in listings:
+        listing.setdefault('fetched_at', written_at)
+    return listings
+
+def verify_listing_files(files):
+    """
+    Check that per-location files handed over by the intake stage are
+    still exactly what was written.
+    
+    Raises:
+        RuntimeError: If a file is missing or its size or hash changed
+    """
+    for result in files:
+        if not verify_write(result):
+            raise RuntimeError(f"{result.path} changed after it was written (expected {result.size} bytes, sha256 {result.sha256[:12]})")
+
+def load_saved_listings(modality, files=None):
+    """
+    Load formatted listings from per-location JSON files written by
+    save_filtered_listings (see read_listing_file).
     
     Args:
         modality: Either "own" or "rent"
-        
+        files: WriteResults handed over by the intake stage. Each file must
+            still match the size and hash it was written with. If omitted,
+            the results directory is globbed once.
+    
     Raises:
-        RuntimeError: If no CSV files are found after retries
+        RuntimeError: If no listing files are found, or a handed-over file has changed
+    """
+    if files is None:
+        listings_dir = results_dir(modality)
+        combined_file = f"{modality}_data.json"
+        json_files = [
+            path for path in sorted(listings_dir.glob(f'*_{modality}.json'))
+            if path.name != combined_file
+        ]
+        print(f"Found {len(json_files)} listing files in {listings_dir}")
+        if not json_files:
+            raise RuntimeError(f"No listing files found for {modality}. Expected *_{modality}.json files in {listings_dir}")
+    else:
+        verify_listing_files(files)
+        json_files = [result.path for result in files]
+    
+    listings = []
+    for listing_file in json_files:
+        try:
+            listings.extend(read_listing_file(listing_file))
+        except Exception as e:
+            print(f"Error reading {listing_file}: {str(e)}")
+    return listings
+
+def generate_listings_data(modality, listings=None, files=None):
     """
-    # Get the current script's directory
-    current_dir = Path(__file__).parent
+    Update the listing store and export the consolidated listings data JSON
+    file for a specific modality.
     
-    # Define paths relative to the script location
-    listings_dir = current_dir / f"{modality}/{modality}_results"
-    output_file = listings_dir / f"{modality}_data.json"
+    Args:
+        modality: Either "own" or "rent"
+        listings: Formatted listings collected during this run (as returned by
+            save_filtered_listings)
+        files: WriteResults of the per-location files produced this run.
+            Verified before the store is updated, and read when listings
+            is omitted.
     
-    # Ensure the listings directory exists
-    if not listings_dir.exists():
-        print(f"Creating listings directory at {listings_dir}")
-        listings_dir.mkdir(parents=True, exist_ok=True)
-        return
-    
-    # Process all listing files
-    all_listings = {}  # Use dict to track unique listings by address
-    max_retries = 3
-    retry_delay = 1  # seconds
-    
-    for attempt in range(max_retries):
-        # Look for both filtered.csv and _filtered.csv patterns
-        csv_files = list(listings_dir.glob('*filtered.csv'))
-        if modality == "own":
-            csv_files.extend(list(listings_dir.glob('*Sale_filtered.csv')))
-        if modality == "rent":
-            csv_files.extend(list(listings_dir.glob('*rent_filtered.csv')))
-            
-        print(f"Found {len(csv_files)} CSV files in {listings_dir}")
-        if csv_files:
-            break
-            
-        if attempt < max_retries - 1:
-            print(f"No CSV files found for {modality}, retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries})")
-            time.sleep(retry_delay)
-            retry_delay *= 2  # Exponential backoff
-    
-    if not csv_files:
-        raise RuntimeError(f"No CSV files found for {modality} after {max_retries} attempts. Expected filtered CSV files in {listings_dir}")
-    
-    # Process each CSV file
-    for listing_file in csv_files:
-        print(f"Processing file: {listing_file}")
-        listing_data = load_listing_file(listing_file)
-        print(f"Found {len(listing_data)} entries in {listing_file}")
-        
-        for listing in listing_data:
-            fmt = format_listing(listing)
-            if fmt is not None:
-                # Use address as key to prevent duplicates
-                # If same address exists, keep the one with the newer list date
-                key = fmt['address']
-                if key not in all_listings or (
-                    fmt.get('list_date', '') > all_listings[key].get('list_date', '')
-                ):
-                    all_listings[key] = fmt
-        
-        print(f"Processed listings from {listing_file}, current unique count: {len(all_listings)}")
-
-    if not all_listings:
-        print(f"Warning: No valid listings found in CSV files for {modality}")
-        return
-
-    # Convert dictionary values to list and sort by date
-    unique_listings = list(all_listings.values())
-    unique_listings.sort(
-        key=lambda x: x.get('list_date', '') or '',  # Use empty string if date is None
-        reverse=True
-    )
-    
-    # Write the combined listing data to a JSON file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(unique_listings, f, ensure_ascii=False, indent=2)
-    
-    print(f"Generated {modality} data file with {len(unique_listings)} unique listings at {output_file}")
+    With neither, the listings are read back from the per-location JSON files
+    in the results directory.
+    
+    Raises:
+        RuntimeError: If a handed-over file has changed since it was written
+    """
+    listings_dir = results_dir(modality)
+    output_file = listings_dir / f"{modality}_data.json"
+    listings_dir.mkdir(parents=True, exist_ok=True)
+    
+    if listings is None:
+        listings = load_saved_listings(modality, files)
+    elif files is not None:
+        verify_listing_files(files)
+        print(f"Verified {len(files)} {modality} location file(s)")
+    
+    # Listings are keyed by zpid; only new or changed ones are rewritten
+    store = get_listing_store()
+    counts = store.upsert(modality, listings)
+    print(f"Listing store ({modality}): {counts['new']} new, {counts['changed']} changed, "
+          f"{counts['unchanged']} unchanged, {counts['outdated']} outdated, {counts['skipped']} without a zpid")
+    
+    exported = store.export(modality, output_file, annotations_file=listings_dir / f"{modality}_proximity.json")
+    if exported is None:
+        print(f"{modality} data file unchanged at {output_file}")
+    elif not exported:
+        print(f"Warning: No valid listings found for {modality}")
+    else:
+        print(f"Generated {modality} data file with {exported} unique listings at {output_file}")
 
-def save_filtered_listings(filtered_listings, modality, location):
+def save_filtered_listings(filtered_listings, modality, location, merge=False):
     """
     Save filtered listings to a JSON file in the appropriate results directory
     
+    A full search replaces the location's file, with an empty list when the
+    location yielded nothing, so no listing from an earlier run is left
+    behind. A delta search (merge) adds its new listings to the file instead,
+    replacing records with the same zpid; the older records keep their
+    fetched_at and still age out of the listing store.
+    
     Args:
         filtered_listings: List of filtered listing results
         modality: "own" or "rent"
         location: Location string (e.g., "Denver, CO")
-    """
-    if not filtered_listings:
-        print(f"No filtered listings to save for {location} {modality}")
-        return
+        merge: Add to the existing file (a --new-only delta) instead of replacing it
         
+    Returns:
+        SavedListings with the formatted listings (empty if there were none)
+        and the WriteResult of the file they were written to (None if nothing
+        was written). The file is complete when this returns.
+    """
     listings_to_save = []
     for listing in filtered_listings:
         formatted_listing = format_listing(listing)
@@ -169,32 +200,26 @@ def save_filtered_listings(filtered_listings, modality, location):
     
     if not listings_to_save:
         print(f"No valid listings to save for {location} {modality}")
-        return
+        if merge:
+            return SavedListings([], None)
     
     # Save to a JSON file in appropriate results directory
-    output_dir = Path(f"{modality}/{modality}_results")
-    output_dir.mkdir(exist_ok=True)
+    output_dir = results_dir(modality)
+    output_dir.mkdir(parents=True, exist_ok=True)
     
     # Generate filename based on location
     safe_location = location.replace(", ", "_").lower()
     output_file = output_dir / f"{safe_location}_{modality}.json"
     
-    # Write the file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(listings_to_save, f, ensure_ascii=False, indent=2)
-    
-    # Verify the file was written successfully with retries
-    max_retries = 3
-    retry_delay = 1  # seconds
-    
-    for attempt in range(max_retries):
-        if output_file.exists() and output_file.stat().st_size > 0:
-            print(f"Saved {len(listings_to_save)} listings to {output_file}")
-            return
-            
-        if attempt < max_retries - 1:
-            print(f"Waiting for file write to complete... (attempt {attempt + 1}/{max_retries})")
-            time.sleep(retry_delay)
-            retry_delay *= 2  # Exponential backoff
-    
-    raise RuntimeError(f"Failed to verify file write for {output_file} after {max_retries} attempts")
+    file_listings = listings_to_save
+    if merge and output_file.exists():
+        new_zpids = {listing['zpid'] for listing in listings_to_save if listing.get('zpid')}
+        file_listings = [
+            listing for listing in read_listing_file(output_file)
+            if not listing.get('zpid') or listing['zpid'] not in new_zpids
+        ] + listings_to_save
+    
+    # Write the file (fsync + atomic rename, so there is nothing to wait for)
+    result = durable_write_json(output_file, file_listings, ensure_ascii=False, indent=2)
+    print(f"Saved {len(file_listings)} listings to {output_file} ({result.size} bytes, sha256 {result.sha256[:12]})")
+    return SavedListings(listings_to_save, result)
@@ -1,10 +1,16 @@
 from typing import List, Dict, Any, Optional
-from client.rapid_api_client_residence import ZillowClient
+from client.rapid_api_client_residence import ZillowClient, RateLimitError, NEWEST_FIRST_SORT
+from client.price_shard_planner import PriceShardPlanner, DEFAULT_MAX_PAGES, DEFAULT_PAGE_SIZE
+from listing_store import get_listing_store, listed_at
+from raw_archive import write_archive, ARCHIVE_SUFFIX
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
 import json
 import os
-import csv
 import datetime
 import sys
+import threading
+import time
 from pathlib import Path
 
 # Add project root to Python path
@@ -13,8 +19,12 @@ sys.path.append(str(Path(__file__).parent.parent))
 class ResidenceSearch:
     """Specialized search class for residential properties."""
     
-    def __init__(self):
-        self.client = ZillowClient()
+    def __init__(self, rate_limiter=None):
+        """
+        Args:
+            rate_limiter: Optional AdaptiveRateLimiter shared by every search thread
+        """
+        self.client = ZillowClient(rate_limiter=rate_limiter)
         self.output_dir = {
             "own": "own/own_results",
             "rent": "rent/rent_results"
@@ -26,35 +36,30 @@ class ResidenceSearch:
         # Create output directories if they don't exist
         for dir_path in self.output_dir.values():
             os.makedirs(dir_path, exist_ok=True)
+        
+        # Listings seen so far this run, by modality and zpid, and the zpids
+        # each location returned (for the overlap report)
+        self._seen = {modality: {} for modality in self.modalities}
+        self._location_zpids = {modality: {} for modality in self.modalities}
+        self._seen_lock = threading.Lock()
+        
+        # Search checkpoints waiting for their listings to reach the store
+        # (see commit_checkpoints), keyed by (modality, location)
+        self._pending_checkpoints = {}
 
-    def _generate_csv_filename(self, modality: str, location: str) -> str:
-        """Generate a filename for the CSV based on modality and location."""
+    def _generate_archive_filename(self, modality: str, location: str) -> str:
+        """Generate a filename for the raw results archive based on modality and location."""
         safe_location = location.replace(",", "").replace(" ", "_").lower() if location else "all"
-        return os.path.join(self.output_dir[modality], f"{safe_location}-{self.modalities[modality].capitalize()}.csv")
+        return os.path.join(self.output_dir[modality], f"{safe_location}-{self.modalities[modality].capitalize()}{ARCHIVE_SUFFIX}")
 
-    def _generate_filtered_csv_filename(self, original_filename: str) -> str:
-        """Generate a filename for filtered results CSV."""
-        base, ext = os.path.splitext(original_filename)
-        return f"{base}_filtered{ext}"
-
-    def _save_to_csv(self, results: List[Dict[str, Any]], modality: str, location: str, filename: Optional[str] = None) -> None:
-        """Save search results to CSV file."""
+    def _save_archive(self, results: List[Dict[str, Any]], modality: str, location: str) -> None:
+        """Save raw search results, with their original keys and types, to a gzip'd JSON Lines archive."""
         if not results:
             print(f"No results to save for {location}")
             return
 
-        output_file = filename or self._generate_csv_filename(modality, location)
-        
-        # Get all possible fields from all results
-        fieldnames = set()
-        for result in results:
-            fieldnames.update(result.keys())
-        
-        with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=sorted(fieldnames))
-            writer.writeheader()
-            writer.writerows(results)
-            
+        output_file = self._generate_archive_filename(modality, location)
+        write_archive(output_file, results)
         print(f"Saved {len(results)} results to {output_file}")
 
     def search_by_location(self, 
@@ -63,7 +68,10 @@ class ResidenceSearch:
                           max_price: Optional[int] = None,
                           min_price: Optional[int] = None,
                           page: int = 1,
-                          num_pages: int = 1) -> Optional[List[Dict[str, Any]]]:
+                          num_pages: int = 1,
+                          exhaustive: bool = False,
+                          max_pages: int = DEFAULT_MAX_PAGES,
+                          new_only: bool = False) -> Optional[List[Dict[str, Any]]]:
         """
         Search for properties by location with retry logic.
         
@@ -74,56 +82,329 @@ class ResidenceSearch:
             min_price: Minimum price filter
             page: Starting page number
             num_pages: Number of pages to retrieve
+            exhaustive: Ignore page/num_pages and fetch every result in the price
+                range, splitting it into smaller ranges where the API would
+                truncate (see PriceShardPlanner)
+            max_pages: Deepest page the API serves, used when exhaustive
+            new_only: Only fetch listings newer than the last search of this
+                location (see search_new_listings); falls back to a full search
+                the first time a location is searched
+            
+        Returns:
+            Filtered results (the raw results are archived), or None if nothing was found
         """
         if modality not in self.modalities:
             raise ValueError(f"Invalid modality. Must be one of: {list(self.modalities.keys())}")
 
         all_results = []
         max_retries = 3
+        store = get_listing_store()
+        checkpoint = store.get_checkpoint(modality, location) if new_only else None
 
         for attempt in range(max_retries):
             try:
-                results = self.client.search_properties(
-                    location=location,
-                    property_type=self.modalities[modality],
-                    max_price=max_price,
-                    min_price=min_price,
-                    page=page,
-                    num_pages=num_pages
-                )
+                fetched_at = time.time()
+                if checkpoint is not None:
+                    results = self.search_new_listings(
+                        modality=modality,
+                        location=location,
+                        checkpoint=checkpoint,
+                        min_price=min_price,
+                        max_price=max_price,
+                        max_pages=max_pages
+                    )
+                elif exhaustive:
+                    # Pages are retried individually by the client, and a page
+                    # that still fails ends the search with partial results, so
+                    # this retry loop never re-fetches the pages already done
+                    planner = PriceShardPlanner(self.client, max_pages=max_pages)
+                    results = planner.search(
+                        location=location,
+                        property_type=self.modalities[modality],
+                        min_price=min_price,
+                        max_price=max_price
+                    )
+                    print(f"{location}: {results['total_results']} results from {len(results['shards'])} "
+                          f"price shard(s) in {results['pages_retrieved']} request(s)")
+                else:
+                    results = self.client.search_properties(
+                        location=location,
+                        property_type=self.modalities[modality],
+                        max_price=max_price,
+                        min_price=min_price,
+                        page=page,
+                        num_pages=num_pages
+                    )
                 
                 if results and "data" in results:
                     all_results.extend(results["data"])
+                
+                # Remember what this search returned for the next delta search,
+                # once the listings are safely in the store. A partial search
+                # must not mark anything as known.
+                if results.get("incomplete"):
+                    print(f"{location}: search incomplete, keeping the previous checkpoint")
+                    break
+                with self._seen_lock:
+                    self._pending_checkpoints[(modality, location)] = (
+                        all_results, fetched_at, checkpoint is not None, results.get("known_zpids", [])
+                    )
                 break  # Success - exit retry loop
                 
             except Exception as e:
                 wait_time = (2 ** attempt)  # Exponential backoff: 1, 2, 4 seconds
+                if isinstance(e, RateLimitError) and e.retry_after:
+                    # The shared limiter already holds every request until then
+                    wait_time = max(wait_time, e.retry_after)
                 
-                if attempt < max_retries - 1:  # Don't log on last attempt
+                if attempt < max_retries - 1:  # Don't log or wait on last attempt
                     error_type = str(e)
                     if "429" in error_type:
-                        print(f"Rate limit exceeded. Waiting {wait_time} seconds before retry {attempt + 1}/{max_retries}")
+                        print(f"Rate limit exceeded. Waiting {wait_time:g} seconds before retry {attempt + 1}/{max_retries}")
                     elif "500" in error_type:
                         print(f"Server error. Waiting {wait_time} seconds before retry {attempt + 1}/{max_retries}")
                     else:
                         print(f"Error: {e}. Waiting {wait_time} seconds before retry {attempt + 1}/{max_retries}")
+                    time.sleep(wait_time)
+                else:
+                    print(f"Giving up on {location} after {max_retries} attempts: {e}")
 
         if all_results:
             # Save raw results
-            self._save_to_csv(all_results, modality, location)
+            self._save_archive(all_results, modality, location)
             
-            # Apply filters and save filtered results
-            filtered_results = self.filter_results(all_results, modality)
-            if filtered_results:
-                filtered_filename = self._generate_filtered_csv_filename(
-                    self._generate_csv_filename(modality, location)
-                )
-                self._save_to_csv(filtered_results, modality, location, filename=filtered_filename)
-            
-            return filtered_results
+            # Filter once; callers format and save what is returned
+            return self.filter_results(all_results, modality)
         
         return None
 
+    def search_new_listings(self,
+                            modality: str,
+                            location: str,
+                            checkpoint,
+                            min_price: Optional[int] = None,
+                            max_price: Optional[int] = None,
+                            max_pages: int = DEFAULT_MAX_PAGES) -> Dict[str, Any]:
+        """
+        Fetch only the listings added since a location's last search.
+
+        Results are requested newest first, and paging stops at the first
+        page that reaches a listing from the checkpoint (a known zpid, or one
+        listed no later than the newest listing seen last time), or that
+        comes back short. A daily refresh usually costs a single request.
+
+        Args:
+            modality: "own" or "rent"
+            location: City and state (e.g., "Denver, CO")
+            checkpoint: SearchCheckpoint from the listing store
+            min_price: Minimum price filter
+            max_price: Maximum price filter
+            max_pages: Deepest page to fetch
+
+        Returns:
+            Dict in the search_properties format with only the new listings,
+            plus "known_zpids": checkpoint listings the API returned again
+        """
+        new_results = []
+        known_zpids = []
+        fetched_at = time.time()
+        page = 0
+        reached_known = False
+        while not reached_known and page < max_pages:
+            page += 1
+            response = self.client.fetch_search_page(
+                location, self.modalities[modality], min_price, max_price, page, NEWEST_FIRST_SORT
+            )
+            page_results = response.get("results", [])
+            for result in page_results:
+                listed = listed_at(result, fetched_at)
+                zpid = str(result.get('zpid'))
+                if zpid in checkpoint.zpids:
+                    reached_known = True
+                    known_zpids.append(zpid)
+                elif listed is not None and checkpoint.newest_listed is not None and listed <= checkpoint.newest_listed:
+                    reached_known = True
+                else:
+                    new_results.append(result)
+            total_pages = response.get("totalPages")
+            if total_pages is not None:
+                if page >= total_pages:
+                    break
+            elif len(page_results) < (response.get("resultsPerPage") or DEFAULT_PAGE_SIZE):
+                break
+        
+        print(f"{location}: {len(new_results)} new listing(s) since last search in {page} request(s)")
+        return {
+            "data": new_results,
+            "total_results": len(new_results),
+            "pages_retrieved": page,
+            "known_zpids": known_zpids
+        }
+
+    def commit_checkpoints(self, modality: str) -> int:
+        """
+        Save the search checkpoints of a modality's searches this run.
+
+        Call this only after the listings from those searches have been
+        upserted into the listing store: a checkpoint marks its listings as
+        known, so the next delta search will not fetch them again. Listings a
+        delta search saw again get their last-seen time bumped, so they stay
+        in the data files.
+
+        Returns:
+            Number of checkpoints saved
+        """
+        with self._seen_lock:
+            pending = {
+                location: self._pending_checkpoints.pop((pending_modality, location))
+                for pending_modality, location in list(self._pending_checkpoints)
+                if pending_modality == modality
+            }
+        
+        store = get_listing_store()
+        for location, (results, fetched_at, merge, known_zpids) in pending.items():
+            store.save_checkpoint(modality, location, results, fetched_at, merge=merge)
+            if known_zpids:
+                store.touch(modality, known_zpids, fetched_at)
+        return len(pending)
+
+    def search_locations_concurrently(self,
+                                      modality: str,
+                                      locations: List[str],
+                                      min_price: Optional[int] = None,
+                                      max_price: Optional[int] = None,
+                                      max_workers: int = 4,
+                                      page: int = 1,
+                                      num_pages: int = 1,
+                                      exhaustive: bool = False,
+                                      max_pages: int = DEFAULT_MAX_PAGES,
+                                      new_only: bool = False) -> Dict[str, Optional[List[Dict[str, Any]]]]:
+        """
+        Run search_by_location for many locations on a bounded thread pool.
+
+        Every page request still goes through the client's shared rate
+        limiter, so concurrency only fills the available quota rather than
+        exceeding it.
+
+        Args:
+            modality: "own" or "rent"
+            locations: Locations to search (e.g. ["Denver, CO", "Aurora, CO"])
+            min_price: Minimum price filter
+            max_price: Maximum price filter
+            max_workers: Maximum number of in-flight searches
+            page: Starting page number
+            num_pages: Number of pages to retrieve per location
+            exhaustive: Fetch every result per location (see search_by_location)
+            max_pages: Deepest page the API serves, used when exhaustive
+            new_only: Only fetch listings added since each location's last search
+
+        Returns:
+            Dictionary keyed by location (in input order) of filtered results not
+            already returned for an earlier location (see claim_new_listings), or None
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                location: executor.submit(
+                    self.search_by_location,
+                    modality=modality,
+                    location=location,
+                    max_price=max_price,
+                    min_price=min_price,
+                    page=page,
+                    num_pages=num_pages,
+                    exhaustive=exhaustive,
+                    max_pages=max_pages,
+                    new_only=new_only
+                )
+                for location in locations
+            }
+            results_by_location = {location: futures[location].result() for location in locations}
+
+        # Claim in input order so the same location owns a shared listing every run
+        return {
+            location: self.claim_new_listings(modality, location, results)
+            for location, results in results_by_location.items()
+        }
+
+    def claim_new_listings(self,
+                           modality: str,
+                           location: str,
+                           results: Optional[List[Dict[str, Any]]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Drop listings already returned by another location's search this run.
+
+        The first location to return a zpid keeps the (canonical) record; every
+        location returning it is appended to that record's matchedLocations,
+        so a listing is formatted and written once however many searches
+        overlap.
+
+        Args:
+            modality: "own" or "rent"
+            location: Location the results were searched for
+            results: Filtered results for the location, or None
+
+        Returns:
+            The listings not seen before this run, or None if results was None
+        """
+        if results is None:
+            return None
+        
+        new_listings = []
+        with self._seen_lock:
+            seen = self._seen[modality]
+            location_zpids = self._location_zpids[modality].setdefault(location, set())
+            for result in results:
+                zpid = result.get('zpid')
+                if not zpid:
+                    new_listings.append(result)
+                    continue
+                location_zpids.add(zpid)
+                canonical = seen.get(zpid)
+                if canonical is None:
+                    seen[zpid] = result
+                    result['matchedLocations'] = [location]
+                    new_listings.append(result)
+                elif location not in canonical['matchedLocations']:
+                    canonical['matchedLocations'].append(location)
+        
+        if len(new_listings) < len(results):
+            print(f"{location}: {len(results) - len(new_listings)} of {len(results)} listings already found for another location")
+        return new_listings
+
+    def overlap_report(self, modality: str, min_ratio: float = 0.0) -> str:
+        """
+        Summarize how much each pair of locations' results overlap.
+
+        For each pair sharing listings, shows the shared count and the share
+        of each location's listings that the other also returned. A location
+        whose listings are nearly all covered by another is a candidate to
+        drop from location.json.
+
+        Args:
+            modality: "own" or "rent"
+            min_ratio: Only list pairs where either side's share is at least this
+        """
+        with self._seen_lock:
+            location_zpids = dict(self._location_zpids[modality])
+        
+        pairs = []
+        for (first, first_zpids), (second, second_zpids) in combinations(location_zpids.items(), 2):
+            shared = len(first_zpids & second_zpids)
+            if not shared:
+                continue
+            first_ratio = shared / len(first_zpids)
+            second_ratio = shared / len(second_zpids)
+            if max(first_ratio, second_ratio) >= min_ratio:
+                pairs.append((max(first_ratio, second_ratio), first, first_ratio, second, second_ratio, shared))
+        
+        if not pairs:
+            return f"Location overlap ({modality}): none"
+        
+        lines = [f"Location overlap ({modality}), shared listings and share of each side:"]
+        for _, first, first_ratio, second, second_ratio, shared in sorted(pairs, reverse=True):
+            lines.append(f"  {first} ({first_ratio:.0%}) / {second} ({second_ratio:.0%}): {shared} shared")
+        return "\n".join(lines)
+
     def filter_results(self, results, modality, exclude_pending=True, exclude_new_construction=False):
         """Filter raw search results based on specified criteria"""
         filtered = []
@@ -0,0 +1,372 @@
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from shared.atomic_write import atomic_write_json
+
+# Listings not returned by any search for this long drop out of the JSON views;
+# a weekly full refresh plus a few days' slack for a late or failed run
+DEFAULT_STALE_AFTER = 10 * 24 * 60 * 60
+
+ZPID_PATTERN = re.compile(r'/(\d+)_zpid')
+
+class SearchCheckpoint(NamedTuple):
+    """What a location's previous search returned, for fetching only newer listings."""
+    zpids: Set[str]
+    newest_listed: Optional[float]
+    searched: float
+
+def listed_at(result: Dict[str, Any], fetched_at: float) -> Optional[float]:
+    """Unix time a raw search result was listed, from its timeOnZillow (milliseconds)."""
+    try:
+        return fetched_at - float(result['timeOnZillow']) / 1000
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def fetched_at(listing: Dict[str, Any]) -> Optional[float]:
+    """Unix time a formatted listing was fetched from the API, or None if unknown."""
+    try:
+        return float(listing['fetched_at'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def listing_zpid(listing: Dict[str, Any]) -> Optional[str]:
+    """Zillow property id of a formatted listing, taken from its zpid or its URL."""
+    if listing.get('zpid'):
+        return str(listing['zpid'])
+    match = ZPID_PATTERN.search(listing.get('url') or '')
+    return match.group(1) if match else None
+
+def listed_at_key(listing: Dict[str, Any]) -> float:
+    """
+    Sort key for a formatted listing's listed_at (Unix time it was listed),
+    so newer listings compare greater; missing values sort last.
+    """
+    try:
+        return float(listing.get('listed_at'))
+    except (TypeError, ValueError):
+        return float('-inf')
+
+# Fields whose change makes a listing "changed". Derived values such as
+# listed_at (recomputed from Zillow's elapsed timeOnZillow on every fetch),
+# fetched_at and matched_locations (which depends on the run) are left out.
+STABLE_FIELDS = ("address", "price", "status", "beds", "baths", "sqft")
+
+def stable_fields(listing: Dict[str, Any]) -> Dict[str, Any]:
+    """The STABLE_FIELDS of a formatted listing, for change detection."""
+    return {field: listing.get(field) for field in STABLE_FIELDS}
+
+def load_annotations(path: Optional[Path]) -> Dict[str, Dict[str, Any]]:
+    """Fields keyed by listing URL from a sidecar JSON file, or {} if there is none."""
+    if path is None:
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+class ListingStore:
+    """
+    SQLite store of formatted listings keyed by modality and zpid.
+
+    Each refresh upserts the listings it fetched: listings whose
+    STABLE_FIELDS are unchanged only get their last-seen time bumped,
+    changed ones are rewritten, and every new price or status is appended to
+    a history table. The JSON views read by own.html / rent.html are
+    exported from the store, and only rewritten when a listing changed or
+    dropped out since the last export.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None, stale_after: float = DEFAULT_STALE_AFTER):
+        """
+        Args:
+            db_path: SQLite database file. If None, uses residence/listings.sqlite3
+            stale_after: Seconds after which an unseen listing is left out of exports
+        """
+        self.db_path = Path(db_path) if db_path else Path(__file__).parent / "listings.sqlite3"
+        self.stale_after = stale_after
+
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS listing (
+                    modality TEXT NOT NULL,
+                    zpid TEXT NOT NULL,
+                    record TEXT NOT NULL,
+                    price REAL,
+                    status TEXT,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (modality, zpid)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS price_history (
+                    modality TEXT NOT NULL,
+                    zpid TEXT NOT NULL,
+                    observed REAL NOT NULL,
+                    price REAL,
+                    status TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS price_history_zpid ON price_history (modality, zpid)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_checkpoint (
+                    modality TEXT NOT NULL,
+                    location TEXT NOT NULL,
+                    zpids TEXT NOT NULL,
+                    newest_listed REAL,
+                    searched REAL NOT NULL,
+                    PRIMARY KEY (modality, location)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS export (
+                    modality TEXT PRIMARY KEY,
+                    exported REAL NOT NULL,
+                    listings INTEGER NOT NULL
+                )
+            """)
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def _price(listing: Dict[str, Any]) -> Optional[float]:
+        try:
+            return float(listing.get('price'))
+        except (TypeError, ValueError):
+            return None
+
+    def upsert(self, modality: str, listings: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Insert or update formatted listings.
+
+        A listing counts as seen at its fetched_at time (the current time if
+        it has none), so listings read back from an old file don't look
+        freshly seen. A record fetched before the stored one was last seen is
+        outdated and left alone.
+
+        Args:
+            modality: "own" or "rent"
+            listings: Formatted listings (see format_listings.format_listing)
+
+        Returns:
+            Counts of new, changed, unchanged, outdated and skipped (no zpid) listings
+        """
+        counts = {"new": 0, "changed": 0, "unchanged": 0, "outdated": 0, "skipped": 0}
+        now = time.time()
+
+        # Collapse repeats within this batch, keeping the newer listing
+        latest = {}
+        for listing in listings:
+            zpid = listing_zpid(listing)
+            if zpid is None:
+                counts["skipped"] += 1
+            elif zpid not in latest or listed_at_key(listing) > listed_at_key(latest[zpid]):
+                latest[zpid] = listing
+
+        conn = self._connect()
+        with conn:
+            for zpid, listing in latest.items():
+                record = json.dumps(dict(listing, zpid=zpid), ensure_ascii=False, sort_keys=True)
+                price = self._price(listing)
+                status = listing.get('status') or None
+                seen = fetched_at(listing) or now
+                row = conn.execute(
+                    "SELECT record, price, status, last_seen FROM listing WHERE modality = ? AND zpid = ?",
+                    (modality, zpid)
+                ).fetchone()
+
+                if row is None:
+                    counts["new"] += 1
+                    conn.execute(
+                        "INSERT INTO listing (modality, zpid, record, price, status, first_seen, last_seen, updated) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (modality, zpid, record, price, status, seen, seen, now)
+                    )
+                elif stable_fields(json.loads(row[0])) == stable_fields(listing):
+                    counts["unchanged"] += 1
+                    conn.execute(
+                        "UPDATE listing SET last_seen = MAX(last_seen, ?) WHERE modality = ? AND zpid = ?",
+                        (seen, modality, zpid)
+                    )
+                    continue
+                elif seen < row[3]:
+                    counts["outdated"] += 1
+                    continue
+                else:
+                    counts["changed"] += 1
+                    conn.execute(
+                        "UPDATE listing SET record = ?, price = ?, status = ?, last_seen = ?, updated = ? "
+                        "WHERE modality = ? AND zpid = ?",
+                        (record, price, status, seen, now, modality, zpid)
+                    )
+                    if (row[1], row[2]) == (price, status):
+                        continue
+
+                conn.execute(
+                    "INSERT INTO price_history (modality, zpid, observed, price, status) VALUES (?, ?, ?, ?, ?)",
+                    (modality, zpid, seen, price, status)
+                )
+        conn.close()
+        return counts
+
+    def touch(self, modality: str, zpids: Iterable[str], seen: Optional[float] = None) -> None:
+        """Mark listings as seen (e.g. known listings a delta search returned again)."""
+        seen = seen or time.time()
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "UPDATE listing SET last_seen = MAX(last_seen, ?) WHERE modality = ? AND zpid = ?",
+                [(seen, modality, str(zpid)) for zpid in zpids]
+            )
+        conn.close()
+
+    def get_checkpoint(self, modality: str, location: str) -> Optional[SearchCheckpoint]:
+        """The checkpoint saved by the last search of a location, or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT zpids, newest_listed, searched FROM search_checkpoint WHERE modality = ? AND location = ?",
+                (modality, location)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        zpids, newest_listed, searched = row
+        return SearchCheckpoint(set(json.loads(zpids)), newest_listed, searched)
+
+    def save_checkpoint(self,
+                        modality: str,
+                        location: str,
+                        results: List[Dict[str, Any]],
+                        fetched_at: float,
+                        merge: bool = False) -> None:
+        """
+        Remember the zpids and newest listing time a location's search returned.
+
+        Args:
+            modality: "own" or "rent"
+            location: Location searched
+            results: Raw (unfiltered) search results
+            fetched_at: Unix time the results were fetched
+            merge: Add to the existing checkpoint (a delta search) instead of
+                replacing it (a full search)
+        """
+        zpids = {str(result['zpid']) for result in results if result.get('zpid')}
+        listed = [value for value in (listed_at(result, fetched_at) for result in results) if value is not None]
+        newest_listed = max(listed) if listed else None
+
+        previous = self.get_checkpoint(modality, location) if merge else None
+        if previous is not None:
+            zpids |= previous.zpids
+            if previous.newest_listed is not None:
+                newest_listed = max(newest_listed or previous.newest_listed, previous.newest_listed)
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_checkpoint (modality, location, zpids, newest_listed, searched) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (modality, location, json.dumps(sorted(zpids)), newest_listed, fetched_at)
+            )
+        conn.close()
+
+    def price_history(self, modality: str, zpid: str) -> List[Dict[str, Any]]:
+        """Recorded (observed, price, status) changes for one listing, oldest first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT observed, price, status FROM price_history "
+                "WHERE modality = ? AND zpid = ? ORDER BY observed",
+                (modality, str(zpid))
+            ).fetchall()
+        finally:
+            conn.close()
+        return [{"observed": observed, "price": price, "status": status} for observed, price, status in rows]
+
+    def active_listings(self, modality: str) -> List[Dict[str, Any]]:
+        """Listings seen within stale_after, most recently listed first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT record FROM listing WHERE modality = ? AND last_seen > ?",
+                (modality, time.time() - self.stale_after)
+            ).fetchall()
+        finally:
+            conn.close()
+        listings = [json.loads(record) for record, in rows]
+        listings.sort(key=listed_at_key, reverse=True)
+        return listings
+
+    def export(self,
+               modality: str,
+               output_file: Path,
+               annotations_file: Optional[Path] = None,
+               force: bool = False) -> Optional[int]:
+        """
+        Write the active listings of a modality to output_file as JSON.
+
+        The file is left alone when no listing was added, changed or went
+        stale since the previous export.
+
+        Args:
+            modality: "own" or "rent"
+            output_file: JSON view to write
+            annotations_file: Sidecar of extra fields keyed by listing URL
+                (the proximity scores written by location.save_listing_proximity),
+                merged into the exported listings so they survive a re-export
+            force: Write even if nothing changed
+
+        Returns:
+            Number of listings written, or None if the export was skipped
+        """
+        conn = self._connect()
+        try:
+            cutoff = time.time() - self.stale_after
+            updated, active = conn.execute(
+                "SELECT MAX(updated), COUNT(*) FROM listing WHERE modality = ? AND last_seen > ?",
+                (modality, cutoff)
+            ).fetchone()
+            previous = conn.execute(
+                "SELECT exported, listings FROM export WHERE modality = ?", (modality,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if (not force and previous is not None and Path(output_file).exists()
+                and (updated or 0) <= previous[0] and active == previous[1]):
+            return None
+
+        listings = self.active_listings(modality)
+        annotations = load_annotations(annotations_file)
+        for listing in listings:
+            listing.update(annotations.get(listing.get('url'), {}))
+        atomic_write_json(output_file, listings, ensure_ascii=False, indent=2)
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO export (modality, exported, listings) VALUES (?, ?, ?)",
+                (modality, time.time(), len(listings))
+            )
+        conn.close()
+        return len(listings)
+
+_listing_store = None
+
+def get_listing_store() -> ListingStore:
+    """Get or create the shared listing store singleton"""
+    global _listing_store
+    if _listing_store is None:
+        _listing_store = ListingStore()
+    return _listing_store
@@ -0,0 +1,24 @@
+import gzip
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Union
+
+from shared.atomic_write import atomic_write
+
+ARCHIVE_SUFFIX = ".jsonl.gz"
+
+def write_archive(path: Union[str, Path], records: Iterable[Dict[str, Any]]) -> bool:
+    """
+    Write raw API results as gzip'd JSON Lines, one result per line.
+
+    Each result keeps its own keys and JSON types, so nothing is padded out
+    to a union of columns or flattened to strings, and the file can be
+    streamed back a line at a time. The gzip header carries no timestamp,
+    so an unchanged result set produces an identical file and atomic_write
+    leaves it alone.
+
+    Returns:
+        True if the file was written, False if it was already up to date
+    """
+    lines = "".join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n" for record in records)
+    return atomic_write(path, gzip.compress(lines.encode('utf-8'), mtime=0))
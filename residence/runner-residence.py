@@ -1,11 +1,15 @@
 import os
+import argparse
 from intake_listings import ResidenceSearch
-from format_listings import generate_listings_data, save_filtered_listings
+from client.price_shard_planner import DEFAULT_MAX_PAGES
+from format_listings import generate_listings_data, save_filtered_listings, SavedListings
 from pathlib import Path
 from datetime import datetime
+from typing import Any, Dict, List, Optional
 from shared.client.nominatim_client import RateLimitedNominatim
 from location.location import load_locations, format_location
 from shared.utility import update_last_refreshed
+from shared.rate_limiter import AdaptiveRateLimiter
 
 def setup_shared_directory():
     project_root = Path(__file__).parent.parent
@@ -22,12 +26,81 @@ def setup_shared_directory():
     (shared_dir / "__init__.py").touch()
     (client_dir / "__init__.py").touch()
 
+def process_location(modality: str,
+                     location: str,
+                     filtered_results: Optional[List[Dict[str, Any]]],
+                     merge: bool = False) -> SavedListings:
+    """
+    Format one location's filtered search results once and save them.
+    
+    Args:
+        modality: "own" or "rent"
+        location: Location string (e.g., "Denver, CO")
+        filtered_results: Results already filtered and deduplicated by ResidenceSearch,
+            or None if the search failed (the location's file is then left alone)
+        merge: Results are a --new-only delta, added to the location's file
+        
+    Returns:
+        SavedListings with the formatted listings and the file written for this location
+    """
+    print(f"\nResults for {location}...")
+    if filtered_results is None:
+        print(f"No results found for {location}")
+        return SavedListings([], None)
+    if not filtered_results:
+        print(f"No new listings for {location}")
+    else:
+        print(f"Found {len(filtered_results)} filtered listings")
+    saved = save_filtered_listings(filtered_results, modality, location, merge=merge)
+    
+    # Display sample of results
+    for listing in saved.listings[:3]:
+        print("\n---")
+        print(f"Address: {listing['address']}")
+        print(f"Price: ${listing['price']}")
+        print(f"Beds/Baths: {listing['beds']}/{listing['baths']}")
+        print(f"Sqft: {listing['sqft']}")
+    return saved
+
 def main():
+    parser = argparse.ArgumentParser(description="Search residential listings for every configured location.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of location searches to run concurrently (default: 4)"
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=1.0,
+        help="Maximum Zillow API requests per second; lowered automatically on 429s (default: 1.0)"
+    )
+    parser.add_argument(
+        "--single-page",
+        action="store_true",
+        help="Fetch only the first page per location instead of every listing in the price range"
+    )
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=DEFAULT_MAX_PAGES,
+        help=f"Deepest page the API serves per search; larger result sets are split by price (default: {DEFAULT_MAX_PAGES})"
+    )
+    parser.add_argument(
+        "--new-only",
+        action="store_true",
+        help="Only fetch listings added since each location's last search. Listings not "
+             "fetched age out of the data files after 10 days, so run a full refresh weekly"
+    )
+    args = parser.parse_args()
+
     # Create required directories and __init__.py files
     setup_shared_directory()
     
     # Create residence search instance
-    residence_search = ResidenceSearch()
+    rate_limiter = AdaptiveRateLimiter(requests_per_second=args.rate_limit, burst=max(args.workers, 1))
+    residence_search = ResidenceSearch(rate_limiter=rate_limiter)
     
     # Load locations from configuration
     metro_areas = load_locations()
@@ -44,110 +117,61 @@ def main():
         }
     }
     
-    # Track whether each modality had results
-    has_results = {
-        "rent": False,
-        "own": False
+    # Formatted listings per modality, aggregated in memory for the data files,
+    # and the per-location files written for them (handed to aggregation)
+    collected = {
+        "rent": [],
+        "own": []
+    }
+    produced = {
+        "rent": [],
+        "own": []
     }
     
     # Search for both rental and sale properties
     for modality in ["rent", "own"]:
         print(f"\n=== Searching {modality.upper()} listings ===")
         
+        # Hubs and suburbs go through the same path
+        locations = []
         for metro in metro_areas:
-            # Process hub city
-            hub = metro["hub_city"]
-            location = format_location(hub["name"], hub["state"])
-            
-            print(f"\nSearching {location}...")
-            
-            # Search with price filters
-            results = residence_search.search_by_location(
-                modality=modality,
-                location=location,
-                min_price=price_ranges[modality]["min_price"],
-                max_price=price_ranges[modality]["max_price"]
-            )
-            
-            if results:
-                print(f"Found {len(results)} total listings")
-                
-                # Filter results
-                filtered_results = residence_search.filter_results(
-                    results=results,
-                    modality=modality,
-                    exclude_pending=True,
-                    exclude_new_construction=False
-                )
-                
-                print(f"Found {len(filtered_results)} filtered listings")
-                
-                if filtered_results:
-                    has_results[modality] = True
-                    # Save filtered results
-                    save_filtered_listings(filtered_results, modality, location)
-                    
-                    # Display sample of results
-                    for listing in filtered_results[:3]:  # Show first 3 listings
-                        print("\n---")
-                        print(f"Address: {listing.get('full_street_line', 'N/A')}")
-                        print(f"Price: ${listing.get('list_price', 'N/A')}")
-                        print(f"Beds/Baths: {listing.get('beds', 'N/A')}/{listing.get('full_baths', 'N/A')}")
-                        print(f"Sqft: {listing.get('sqft', 'N/A')}")
-            else:
-                print(f"No results found for {location}")
-            
-            # Process suburbs
-            for suburb in metro["suburbs"]:
-                location = format_location(suburb["name"], suburb["state"])
-                print(f"\nSearching {location}...")
-                
-                results = residence_search.search_by_location(
-                    modality=modality,
-                    location=location,
-                    min_price=price_ranges[modality]["min_price"],
-                    max_price=price_ranges[modality]["max_price"]
-                )
-                
-                if results:
-                    print(f"Found {len(results)} total listings")
-                    
-                    filtered_results = residence_search.filter_results(
-                        results=results,
-                        modality=modality,
-                        exclude_pending=True,
-                        exclude_new_construction=False
-                    )
-                    
-                    print(f"Found {len(filtered_results)} filtered listings")
-                    
-                    if filtered_results:
-                        has_results[modality] = True
-                        # Save filtered results
-                        save_filtered_listings(filtered_results, modality, location)
-                        
-                        # Display sample of results
-                        for listing in filtered_results[:3]:
-                            print("\n---")
-                            print(f"Address: {listing.get('full_street_line', 'N/A')}")
-                            print(f"Price: ${listing.get('list_price', 'N/A')}")
-                            print(f"Beds/Baths: {listing.get('beds', 'N/A')}/{listing.get('full_baths', 'N/A')}")
-                            print(f"Sqft: {listing.get('sqft', 'N/A')}")
-                else:
-                    print(f"No results found for {location}")
+            for place in [metro["hub_city"]] + metro["suburbs"]:
+                locations.append(format_location(place["name"], place["state"]))
+        
+        # Fetch (and filter) every location concurrently, paced by the shared rate limiter
+        results_by_location = residence_search.search_locations_concurrently(
+            modality=modality,
+            locations=locations,
+            min_price=price_ranges[modality]["min_price"],
+            max_price=price_ranges[modality]["max_price"],
+            max_workers=args.workers,
+            exhaustive=not args.single_page,
+            max_pages=args.max_pages,
+            new_only=args.new_only
+        )
+        
+        for location in locations:
+            saved = process_location(modality, location, results_by_location.get(location), merge=args.new_only)
+            collected[modality].extend(saved.listings)
+            if saved.file is not None:
+                produced[modality].append(saved.file)
+        
+        print(f"\n{residence_search.overlap_report(modality)}")
     
-    # Generate the formatted data files only for modalities with results
+    # Build the data files from the records gathered above
     print("\nGenerating formatted listing data...")
     for modality in ["rent", "own"]:
-        if has_results[modality]:
-            print(f"Generating {modality} data file...")
-            try:
-                generate_listings_data(modality)
-            except RuntimeError as e:
-                print(f"Error generating {modality} data: {e}")
+        if collected[modality]:
+            print(f"Generating {modality} data file from {len(collected[modality])} listing(s) collected this run...")
+            generate_listings_data(modality, listings=collected[modality], files=produced[modality])
         else:
             print(f"Skipping {modality} data generation - no results found")
+        
+        # Only now are this run's listings in the store; mark them as known
+        residence_search.commit_checkpoints(modality)
     
+    print(residence_search.client.transport.report())
+    print(rate_limiter.report())
     print("\nResidence search pipeline complete!")
     
     # Update the last-refreshed timestamp in index.html
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, NamedTuple, Union
+
+class WriteResult(NamedTuple):
+    """Outcome of a durable write: what is now on disk at path."""
+    path: Path
+    size: int
+    sha256: str
+    written: bool
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _fsync_directory(directory: Path) -> None:
+    # Persist the rename itself; not supported on every platform
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def durable_write(path: Union[str, Path], content: Union[str, bytes], encoding: str = 'utf-8') -> WriteResult:
+    """
+    Atomically and durably replace path with content.
+
+    The content is written to a temporary file in the same directory,
+    fsynced and moved over the target with os.replace (and the directory
+    fsynced), so readers (such as a running http.server) only ever see the
+    old or the new file, never a missing or half-written one. If the
+    existing file already has identical content the write is skipped.
+
+    Once this returns the file is complete, so callers can hand the result
+    to the next stage instead of polling the filesystem for it.
+
+    Args:
+        path: File to write
+        content: Text or bytes to write
+        encoding: Encoding used when content is text
+
+    Returns:
+        WriteResult with the size and sha256 of the file, and whether it was written
+    """
+    path = Path(path)
+    data = content.encode(encoding) if isinstance(content, str) else content
+    digest = hashlib.sha256(data).hexdigest()
+
+    try:
+        if path.stat().st_size == len(data) and _file_digest(path) == digest:
+            return WriteResult(path, len(data), digest, False)
+    except FileNotFoundError:
+        pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        # mkstemp creates the file 0600; keep the usual permissions for served files
+        os.chmod(tmp_path, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    _fsync_directory(path.parent)
+    return WriteResult(path, len(data), digest, True)
+
+def durable_write_json(path: Union[str, Path], data: Any, **dump_kwargs) -> WriteResult:
+    """Serialize data with json.dumps(**dump_kwargs) and write it with durable_write."""
+    return durable_write(path, json.dumps(data, **dump_kwargs))
+
+def verify_write(result: WriteResult) -> bool:
+    """True if the file at result.path still has the size and hash recorded in result."""
+    try:
+        return result.path.stat().st_size == result.size and _file_digest(result.path) == result.sha256
+    except FileNotFoundError:
+        return False
+
+def atomic_write(path: Union[str, Path], content: Union[str, bytes], encoding: str = 'utf-8') -> bool:
+    """
+    Atomically replace path with content (see durable_write).
+
+    Returns:
+        True if the file was written, False if it was already up to date
+    """
+    return durable_write(path, content, encoding).written
+
+def atomic_write_json(path: Union[str, Path], data: Any, **dump_kwargs) -> bool:
+    """
+    Serialize data with json.dumps(**dump_kwargs) and write it with atomic_write.
+
+    Returns:
+        True if the file was written, False if it was already up to date
+    """
+    return atomic_write(path, json.dumps(data, **dump_kwargs))
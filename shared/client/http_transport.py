@@ -0,0 +1,146 @@
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Connections opened by the current thread; urllib3 opens a connection in
+# the thread that needs it, so this attributes each one to its request
+_opened = threading.local()
+
+class _CountingPoolMixin:
+    def _new_conn(self):
+        _opened.count = getattr(_opened, "count", 0) + 1
+        return super()._new_conn()
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    pass
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+class HttpTransport:
+    """
+    Shared keep-alive HTTP transport for the RapidAPI clients.
+
+    Wraps a single requests.Session whose urllib3 pools keep HTTP/1.1
+    connections open between calls, negotiates gzip, and caps the number of
+    concurrent connections per host. Per-host latency and connection reuse
+    are tracked so handshake savings can be reported.
+    """
+
+    def __init__(self,
+                 pool_maxsize: int = 10,
+                 per_host_limits: Optional[Dict[str, int]] = None,
+                 timeout: float = 30):
+        """
+        Args:
+            pool_maxsize: Default maximum open connections per host
+            per_host_limits: Optional overrides of maximum connections keyed by host
+            timeout: Default request timeout in seconds
+        """
+        self.pool_maxsize = pool_maxsize
+        self.per_host_limits = per_host_limits or {}
+        self.timeout = timeout
+
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_maxsize,
+            pool_maxsize=pool_maxsize,
+            pool_block=True
+        )
+        self.adapter.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool
+        }
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive"
+        })
+
+        self._host_slots = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _slots(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._host_slots:
+                limit = self.per_host_limits.get(host, self.pool_maxsize)
+                self._host_slots[host] = threading.BoundedSemaphore(limit)
+            return self._host_slots[host]
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request over the pooled session.
+
+        Accepts the same keyword arguments as requests.Session.request and
+        raises the same exceptions.
+        """
+        host = urlsplit(url).hostname or ""
+        kwargs.setdefault("timeout", self.timeout)
+
+        with self._slots(host):
+            _opened.count = 0
+            start = time.perf_counter()
+            try:
+                return self.session.request(method, url, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._record(host, elapsed, _opened.count)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request over the pooled session."""
+        return self.request("GET", url, **kwargs)
+
+    def _record(self, host: str, elapsed: float, new_connections: int) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(host, {
+                "requests": 0,
+                "new_connections": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0
+            })
+            stats["requests"] += 1
+            stats["new_connections"] += new_connections
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-host request counts, connection reuse and latency."""
+        with self._lock:
+            result = {}
+            for host, stats in self._stats.items():
+                requests_made = stats["requests"]
+                result[host] = {
+                    **stats,
+                    "reused_connections": requests_made - stats["new_connections"],
+                    "mean_seconds": stats["total_seconds"] / requests_made if requests_made else 0.0
+                }
+            return result
+
+    def report(self) -> str:
+        """Summarize per-host latency and connection reuse."""
+        lines = []
+        for host, stats in sorted(self.stats().items()):
+            lines.append(
+                f"{host}: {stats['requests']} requests over {stats['new_connections']} connections "
+                f"({stats['reused_connections']} reused), "
+                f"mean {stats['mean_seconds'] * 1000:.0f} ms, max {stats['max_seconds'] * 1000:.0f} ms"
+            )
+        return "\n".join(lines) if lines else "No HTTP requests made"
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def get_transport() -> HttpTransport:
+    """Get or create the shared HTTP transport singleton"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport()
+        return _transport
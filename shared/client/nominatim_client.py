@@ -1,23 +1,162 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
+from geopy.exc import GeocoderServiceError, GeocoderTimedOut
+from geopy.location import Location
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+import threading
 import time
 
-class RateLimitedNominatim:
-    def __init__(self, user_agent, min_delay_seconds=1):
+from shared.geocode_cache import GeocodeCache
+
+class CachedGeocoder(ABC):
+    """
+    Base class for geocoding backends.
+
+    Subclasses implement _fetch() and set max_workers; this class adds the
+    geocode cache in front of them and the bulk geocode_many() API.
+    """
+
+    max_workers = 1
+    # Whether "not found" answers are cached. The cache is shared by every
+    # backend, so only backends with complete coverage should set this.
+    remember_misses = True
+
+    def __init__(self, cache: Optional[GeocodeCache] = None):
+        self.cache = cache
+
+    @abstractmethod
+    def _fetch(self, location_string, exactly_one=True):
+        """Geocode location_string with the backend, without the cache."""
+
+    def _from_cache(self, location_string):
+        """Return (True, result) for a cached hit or remembered miss, else (False, None)."""
+        cached = self.cache.get(location_string) if self.cache else None
+        if cached is None:
+            return False, None
+        if not cached.found:
+            return True, None
+        return True, Location(cached.address or location_string,
+                              (cached.latitude, cached.longitude),
+                              cached.raw or {})
+
+    def _store(self, location_string, result) -> None:
+        if not self.cache:
+            return
+        if result:
+            self.cache.put_hit(location_string, result.latitude, result.longitude,
+                               result.address, result.raw)
+        elif self.remember_misses:
+            self.cache.put_miss(location_string)
+
+    def geocode(self, location_string, exactly_one=True):
+        # Serve hits and remembered misses without touching the backend
+        if exactly_one:
+            cached, result = self._from_cache(location_string)
+            if cached:
+                return result
+        return self._fetch_and_store(location_string, exactly_one)
+
+    def _fetch_and_store(self, location_string, exactly_one=True):
+        try:
+            result = self._fetch(location_string, exactly_one=exactly_one)
+        except (GeocoderTimedOut, GeocoderServiceError) as e:
+            # Timeouts and service errors are transient, so they are not remembered as misses
+            print(f"Error while geocoding {location_string}: {e}")
+            return None
+
+        if exactly_one:
+            self._store(location_string, result)
+        return result
+
+    def geocode_many(self, location_strings: Iterable[str]) -> Dict[str, Optional[Location]]:
+        """
+        Geocode many strings at once.
+
+        Inputs are deduplicated (case- and whitespace-insensitively), cache
+        hits are served immediately, and only the remaining misses are sent
+        to the backend, up to max_workers at a time.
+
+        Returns:
+            Dictionary mapping each input string to its Location, or None if not found
+        """
+        queries = {}
+        for location_string in location_strings:
+            queries.setdefault(GeocodeCache.normalize_query(location_string), []).append(location_string)
+
+        results = {}
+        pending = []
+        for variants in queries.values():
+            cached, result = self._from_cache(variants[0])
+            if cached:
+                for variant in variants:
+                    results[variant] = result
+            else:
+                pending.append(variants)
+
+        if pending:
+            print(f"Geocoding {len(pending)} of {len(queries)} unique locations "
+                  f"with {self.max_workers} worker(s)...")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                fetched = executor.map(lambda variants: self._fetch_and_store(variants[0]), pending)
+                for variants, result in zip(pending, fetched):
+                    for variant in variants:
+                        results[variant] = result
+
+        return results
+
+class RateLimitedNominatim(CachedGeocoder):
+    """Public nominatim.org backend, limited to one request per min_delay_seconds."""
+
+    max_workers = 1
+
+    def __init__(self, user_agent, min_delay_seconds=1, cache: Optional[GeocodeCache] = None):
+        super().__init__(cache)
         self.geocoder = Nominatim(user_agent=user_agent)
         self.min_delay_seconds = min_delay_seconds
         self.last_request_time = 0
+        self._lock = threading.Lock()
 
-    def geocode(self, location_string, exactly_one=True):
-        # Ensure minimum delay between requests
-        time_since_last_request = time.time() - self.last_request_time
-        if time_since_last_request < self.min_delay_seconds:
-            time.sleep(self.min_delay_seconds - time_since_last_request)
-        
-        try:
-            result = self.geocoder.geocode(location_string, exactly_one=exactly_one)
-            self.last_request_time = time.time()
-            return result
-        except GeocoderTimedOut:
-            print(f"Timeout while geocoding {location_string}")
-            return None 
\ No newline at end of file
+    def _fetch(self, location_string, exactly_one=True):
+        with self._lock:
+            # Ensure minimum delay between requests
+            time_since_last_request = time.time() - self.last_request_time
+            if time_since_last_request < self.min_delay_seconds:
+                time.sleep(self.min_delay_seconds - time_since_last_request)
+            try:
+                return self.geocoder.geocode(location_string, exactly_one=exactly_one)
+            finally:
+                self.last_request_time = time.time()
+
+class LocalNominatim(CachedGeocoder):
+    """
+    Backend for a self-hosted Nominatim or the fixture server in
+    shared/client/nominatim_fixture_server.py. There is no usage policy to
+    respect, so requests run unthrottled on max_workers threads.
+
+    A local server may cover far less than nominatim.org (the fixture
+    server only knows location.json places), so its misses are not cached:
+    they would otherwise hide real results from later public lookups.
+    """
+
+    remember_misses = False
+
+    def __init__(self,
+                 base_url: str = "http://localhost:8088",
+                 user_agent: str = "healthcare_housing_search",
+                 max_workers: int = 32,
+                 timeout: float = 10,
+                 cache: Optional[GeocodeCache] = None):
+        super().__init__(cache)
+        parts = urlsplit(base_url)
+        self.geocoder = Nominatim(
+            user_agent=user_agent,
+            domain=parts.netloc + parts.path.rstrip("/"),
+            scheme=parts.scheme or "http",
+            timeout=timeout
+        )
+        self.max_workers = max_workers
+
+    def _fetch(self, location_string, exactly_one=True):
+        return self.geocoder.geocode(location_string, exactly_one=exactly_one)
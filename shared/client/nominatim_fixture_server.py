@@ -0,0 +1,113 @@
+"""
+Minimal stand-in for the Nominatim /search endpoint.
+
+Serves coordinates from a JSON fixture (or, by default, from every hub and
+suburb in location/location.json) so bulk geocoding backfills and load
+tests can run against LocalNominatim without touching nominatim.org.
+
+Usage:
+    python shared/client/nominatim_fixture_server.py --port 8088 [--fixture fixture.json] [--latency 0.05]
+"""
+import argparse
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from shared.geocode_cache import GeocodeCache
+
+def load_fixture(fixture_path: Optional[Path] = None) -> Dict[str, Tuple[float, float, str]]:
+    """
+    Load query -> (lat, lon, display_name) fixtures keyed by normalized query.
+
+    A fixture file maps query strings to [lat, lon]. Without one, every hub
+    and suburb in location.json is served under its abbreviation and full
+    state name forms.
+    """
+    fixtures = {}
+    if fixture_path:
+        with open(fixture_path) as f:
+            for query, (lat, lon) in json.load(f).items():
+                fixtures[GeocodeCache.normalize_query(query)] = (lat, lon, query)
+        return fixtures
+
+    from location.location import load_locations, STATE_MAPPING
+    for metro in load_locations():
+        for place in [metro["hub_city"]] + metro["suburbs"]:
+            lat, lon = place["coordinates"]["lat"], place["coordinates"]["lng"]
+            state_name = STATE_MAPPING.get(place["state"], place["state"])
+            display_name = f"{place['name']}, {state_name}, United States"
+            for query in (f"{place['name']}, {place['state']}",
+                          f"{place['name']}, {state_name}, United States"):
+                fixtures[GeocodeCache.normalize_query(query)] = (lat, lon, display_name)
+    return fixtures
+
+def make_handler(fixtures: Dict[str, Tuple[float, float, str]], latency: float = 0.0):
+    """Build a request handler class serving the given fixtures."""
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path.rstrip("/") != "/search":
+                self.send_error(404)
+                return
+
+            if latency:
+                time.sleep(latency)
+
+            params = parse_qs(parts.query)
+            query = GeocodeCache.normalize_query(params.get("q", [""])[0])
+            results = []
+            if query in fixtures:
+                lat, lon, display_name = fixtures[query]
+                results.append({
+                    "lat": str(lat),
+                    "lon": str(lon),
+                    "display_name": display_name
+                })
+
+            body = json.dumps(results).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+def serve(port: int = 8088,
+          fixture_path: Optional[Path] = None,
+          latency: float = 0.0) -> ThreadingHTTPServer:
+    """Create (but do not start) a threaded fixture server on localhost."""
+    fixtures = load_fixture(fixture_path)
+    print(f"Serving {len(fixtures)} fixture locations on http://localhost:{port}/search")
+    return ThreadingHTTPServer(("localhost", port), make_handler(fixtures, latency))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Nominatim /search fixture server.")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--fixture", type=Path, default=None, help="JSON file mapping query to [lat, lon]")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of simulated latency per request")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.fixture, args.latency)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
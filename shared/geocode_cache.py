@@ -0,0 +1,138 @@
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+
+# Successful lookups rarely change; failed ones are retried sooner
+DEFAULT_HIT_TTL = 365 * 24 * 60 * 60
+DEFAULT_MISS_TTL = 7 * 24 * 60 * 60
+
+class CachedGeocode(NamedTuple):
+    """A cached geocoding outcome; found is False for a remembered miss."""
+    found: bool
+    latitude: Optional[float]
+    longitude: Optional[float]
+    address: Optional[str]
+    raw: Optional[Dict[str, Any]]
+
+class GeocodeCache:
+    """
+    SQLite-backed cache of geocoding results, including misses.
+
+    Every entry carries its own expiry, so hits and misses can have
+    different TTLs. Each operation opens a short-lived connection on a WAL
+    database, which makes the cache safe to share between threads and
+    between the location and residence pipelines running at the same time.
+    """
+
+    def __init__(self,
+                 db_path: Optional[Path] = None,
+                 hit_ttl: float = DEFAULT_HIT_TTL,
+                 miss_ttl: float = DEFAULT_MISS_TTL):
+        """
+        Args:
+            db_path: SQLite database file. If None, uses shared/geocode_cache.sqlite3
+            hit_ttl: Seconds a successful lookup stays valid
+            miss_ttl: Seconds a failed lookup is remembered
+        """
+        self.db_path = Path(db_path) if db_path else Path(__file__).parent / "geocode_cache.sqlite3"
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0}
+
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS geocode (
+                    query TEXT PRIMARY KEY,
+                    found INTEGER NOT NULL,
+                    latitude REAL,
+                    longitude REAL,
+                    address TEXT,
+                    raw TEXT,
+                    created REAL NOT NULL,
+                    expires REAL NOT NULL
+                )
+            """)
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Case- and whitespace-insensitive cache key for a geocoding query."""
+        return " ".join(query.lower().split())
+
+    def get(self, query: str) -> Optional[CachedGeocode]:
+        """Return the cached outcome for query, or None if unknown or expired."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT found, latitude, longitude, address, raw FROM geocode "
+                "WHERE query = ? AND expires > ?",
+                (self.normalize_query(query), time.time())
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+
+        found, latitude, longitude, address, raw = row
+        self.stats["hits" if found else "negative_hits"] += 1
+        return CachedGeocode(bool(found), latitude, longitude, address, json.loads(raw) if raw else None)
+
+    def _put(self, query: str, found: bool, latitude, longitude, address, raw, ttl: float) -> None:
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode "
+                "(query, found, latitude, longitude, address, raw, created, expires) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.normalize_query(query), int(found), latitude, longitude, address,
+                 json.dumps(raw) if raw is not None else None, now, now + ttl)
+            )
+        conn.close()
+
+    def put_hit(self,
+                query: str,
+                latitude: float,
+                longitude: float,
+                address: Optional[str] = None,
+                raw: Optional[Dict[str, Any]] = None) -> None:
+        """Remember a successful lookup."""
+        self._put(query, True, latitude, longitude, address, raw, self.hit_ttl)
+
+    def put_miss(self, query: str) -> None:
+        """Remember that a query returned no result."""
+        self._put(query, False, None, None, None, None, self.miss_ttl)
+
+    def purge_expired(self) -> int:
+        """Delete expired entries, returning how many were removed."""
+        conn = self._connect()
+        with conn:
+            removed = conn.execute("DELETE FROM geocode WHERE expires <= ?", (time.time(),)).rowcount
+        conn.close()
+        return removed
+
+    def report(self) -> str:
+        """Summarize cache activity for this run."""
+        stats = self.stats
+        return (
+            f"Geocode cache: {stats['hits']} hits, {stats['negative_hits']} remembered misses, "
+            f"{stats['misses']} lookups sent to the geocoder"
+        )
+
+_geocode_cache = None
+
+def get_geocode_cache() -> GeocodeCache:
+    """Get or create the shared geocode cache singleton"""
+    global _geocode_cache
+    if _geocode_cache is None:
+        _geocode_cache = GeocodeCache()
+    return _geocode_cache
@@ -0,0 +1,27 @@
+import math
+from typing import Dict, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+EARTH_RADIUS_MILES = 3958.8
+
+def _central_angle(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * math.asin(math.sqrt(a))
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometers."""
+    return EARTH_RADIUS_KM * _central_angle(lat1, lon1, lat2, lon2)
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in miles."""
+    return EARTH_RADIUS_MILES * _central_angle(lat1, lon1, lat2, lon2)
+
+def record_coordinates(record: Dict) -> Optional[Tuple[float, float]]:
+    """Return a record's (latitude, longitude) as floats, or None if missing or invalid."""
+    try:
+        return float(record['latitude']), float(record['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None
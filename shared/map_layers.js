@@ -0,0 +1,109 @@
+// Builds the map overlay layers from the compact payload written by
+// generate_map() in location/location.py (see build_map_payload there).
+(function () {
+    var BuildingIcon = L.Icon.extend({
+        options: {
+            iconSize: [32, 32],
+            iconAnchor: [16, 32],
+            popupAnchor: [0, -32]
+        }
+    });
+
+    var icons = {
+        hospitals: new BuildingIcon({iconUrl: 'icon/hospital.png'}),
+        houses: new BuildingIcon({iconUrl: 'icon/house.png'}),
+        rentals: new BuildingIcon({iconUrl: 'icon/rental.png'}),
+        jobs: new BuildingIcon({iconUrl: 'icon/job.png'})
+    };
+
+    function escapeHtml(value) {
+        return String(value)
+            .replace(/&/g, '&amp;')
+            .replace(/</g, '&lt;')
+            .replace(/>/g, '&gt;')
+            .replace(/"/g, '&quot;')
+            .replace(/'/g, '&#39;');
+    }
+
+    function link(url, html) {
+        return '<a href="' + escapeHtml(url) + '" target="_blank">' + html + '</a>';
+    }
+
+    // Popup HTML per layer, built only when a popup is opened.
+    // prefix is the URL prefix shared by every row of the layer.
+    var popups = {
+        hospitals: function (prefix, row) { return escapeHtml(row[2]); },
+        houses: function (prefix, row) { return link(prefix + row[3], '$' + escapeHtml(row[2])); },
+        rentals: function (prefix, row) { return link(prefix + row[3], '$' + escapeHtml(row[2])); },
+        jobs: function (prefix, row) { return link(prefix + row[4], escapeHtml(row[2]) + '<br>' + escapeHtml(row[3])); }
+    };
+
+    function addRows(layers, data) {
+        var prefixes = data.url_prefixes || {};
+        Object.keys(layers).forEach(function (name) {
+            var rows = data[name] || [];
+            var prefix = prefixes[name] || '';
+            var markers = new Array(rows.length);
+            for (var i = 0; i < rows.length; i++) {
+                var row = rows[i];
+                markers[i] = L.marker([row[0], row[1]], {icon: icons[name]})
+                    .bindPopup(popups[name].bind(null, prefix, row));
+            }
+            // One batched add per layer instead of one call per marker
+            layers[name].addLayer(L.layerGroup(markers));
+        });
+    }
+
+    // layers: {hospitals, houses, rentals, jobs} layer groups to fill.
+    // source: the payload object itself, or the URL of a sidecar JSON file.
+    window.loadMapLayers = function (layers, source) {
+        if (typeof source !== 'string') {
+            addRows(layers, source);
+            return;
+        }
+        fetch(source)
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.status + ' ' + response.statusText);
+                }
+                return response.json();
+            })
+            .then(function (data) { addRows(layers, data); })
+            .catch(function (error) { console.error('Could not load map data from ' + source, error); });
+    };
+
+    // layers: {hospitals, houses, rentals, jobs} layer groups to fill.
+    // endpoint: /markers URL of the spatial index service (location/runner-spatial.py).
+    // The layers are reloaded with just the markers in view whenever the map moves.
+    window.loadViewportLayers = function (layers, endpoint) {
+        window.addEventListener('load', function () {
+            var map = window.map;
+            var pending = null;
+
+            function refresh() {
+                var bounds = map.getBounds();
+                var bbox = [bounds.getSouth(), bounds.getWest(), bounds.getNorth(), bounds.getEast()]
+                    .map(function (value) { return value.toFixed(5); })
+                    .join(',');
+                if (pending) {
+                    pending.abort();
+                }
+                pending = new AbortController();
+                fetch(endpoint + '?bbox=' + bbox, {signal: pending.signal})
+                    .then(function (response) { return response.json(); })
+                    .then(function (data) {
+                        Object.keys(layers).forEach(function (name) { layers[name].clearLayers(); });
+                        addRows(layers, data);
+                    })
+                    .catch(function (error) {
+                        if (error.name !== 'AbortError') {
+                            console.error('Could not load map data from ' + endpoint, error);
+                        }
+                    });
+            }
+
+            map.on('moveend', refresh);
+            refresh();
+        });
+    };
+})();
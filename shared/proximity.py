@@ -0,0 +1,135 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from shared.geodesy import EARTH_RADIUS_MILES, record_coordinates
+
+# Composite score weights and distance scales (miles / job counts)
+FACILITY_WEIGHT = 50.0
+JOB_WEIGHT = 50.0
+FACILITY_SCALE_MILES = 5.0
+JOB_SCALE = 5.0
+
+def coordinate_array(records: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build an (n, 2) float array of [latitude, longitude] in radians.
+
+    Records without usable coordinates are left out.
+
+    Returns:
+        (coordinates, indices) where indices maps each row back to its record
+    """
+    rows = []
+    indices = []
+    for i, record in enumerate(records):
+        coords = record_coordinates(record)
+        if coords and all(map(math.isfinite, coords)):
+            rows.append(coords)
+            indices.append(i)
+    coordinates = np.radians(np.array(rows, dtype=np.float64).reshape(-1, 2))
+    return coordinates, np.array(indices, dtype=np.int64)
+
+def haversine_matrix(origins: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distances in miles between every origin and every target.
+
+    Args:
+        origins: (n, 2) array of [lat, lon] in radians
+        targets: (m, 2) array of [lat, lon] in radians
+
+    Returns:
+        (n, m) distance matrix
+    """
+    lat1 = origins[:, 0:1]
+    lon1 = origins[:, 1:2]
+    lat2 = targets[:, 0]
+    lon2 = targets[:, 1]
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def nearest(origins: np.ndarray,
+            targets: np.ndarray,
+            block_size: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distance to, and index of, the nearest target for each origin.
+
+    The distance matrix is computed block_size origins at a time, so memory
+    stays at block_size * len(targets) floats however many origins there are.
+
+    Returns:
+        (distances, indices); distances are inf and indices -1 when there are no targets
+    """
+    distances = np.full(len(origins), np.inf)
+    indices = np.full(len(origins), -1, dtype=np.int64)
+    if not len(targets):
+        return distances, indices
+    for start in range(0, len(origins), block_size):
+        block = haversine_matrix(origins[start:start + block_size], targets)
+        indices[start:start + len(block)] = block.argmin(axis=1)
+        distances[start:start + len(block)] = block[np.arange(len(block)), indices[start:start + len(block)]]
+    return distances, indices
+
+def count_within(origins: np.ndarray,
+                 targets: np.ndarray,
+                 radius_miles: float,
+                 block_size: int = 1024) -> np.ndarray:
+    """Number of targets within radius_miles of each origin, computed in blocks."""
+    counts = np.zeros(len(origins), dtype=np.int64)
+    if not len(targets):
+        return counts
+    for start in range(0, len(origins), block_size):
+        block = haversine_matrix(origins[start:start + block_size], targets)
+        counts[start:start + len(block)] = (block <= radius_miles).sum(axis=1)
+    return counts
+
+def composite_score(facility_miles: np.ndarray, jobs_nearby: np.ndarray) -> np.ndarray:
+    """
+    Score from 0 to 100: up to FACILITY_WEIGHT for being close to a facility
+    (halving roughly every 3.5 miles) plus up to JOB_WEIGHT for the number of
+    nearby jobs (saturating after a dozen or so).
+    """
+    facility_part = FACILITY_WEIGHT * np.exp(-facility_miles / FACILITY_SCALE_MILES)
+    job_part = JOB_WEIGHT * (1 - np.exp(-jobs_nearby / JOB_SCALE))
+    return facility_part + job_part
+
+def score_listings(listings: List[Dict],
+                   facilities: List[Dict],
+                   jobs: List[Dict],
+                   radius_miles: float = 10.0,
+                   block_size: int = 1024) -> List[Optional[Dict]]:
+    """
+    Score listings by proximity to facilities and jobs.
+
+    Args:
+        listings: Residence dictionaries with latitude and longitude
+        facilities: Facility dictionaries with latitude, longitude and name
+        jobs: Geocoded job dictionaries with latitude and longitude
+        radius_miles: Radius for counting nearby jobs
+        block_size: Listings per distance-matrix block
+
+    Returns:
+        One entry per listing (None for listings without coordinates) with
+        nearest_facility, nearest_facility_miles, jobs_nearby,
+        jobs_radius_miles and proximity_score
+    """
+    listing_coords, listing_rows = coordinate_array(listings)
+    facility_coords, facility_rows = coordinate_array(facilities)
+    job_coords, _ = coordinate_array(jobs)
+
+    facility_miles, facility_index = nearest(listing_coords, facility_coords, block_size)
+    jobs_nearby = count_within(listing_coords, job_coords, radius_miles, block_size)
+    scores = composite_score(facility_miles, jobs_nearby)
+
+    results: List[Optional[Dict]] = [None] * len(listings)
+    for row, listing_index in enumerate(listing_rows):
+        has_facility = facility_index[row] >= 0
+        results[listing_index] = {
+            "nearest_facility": facilities[facility_rows[facility_index[row]]].get('name') if has_facility else None,
+            "nearest_facility_miles": round(float(facility_miles[row]), 2) if has_facility else None,
+            "jobs_nearby": int(jobs_nearby[row]),
+            "jobs_radius_miles": radius_miles,
+            "proximity_score": round(float(scores[row]), 1)
+        }
+    return results
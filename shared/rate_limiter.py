@@ -0,0 +1,172 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+class HostRateLimiter:
+    """
+    Thread-safe rate limiter that spaces requests to each host.
+
+    Each call to wait() reserves the next free slot for the host and sleeps
+    until it arrives, so concurrent workers hitting the same host are
+    serialized to the configured rate while other hosts are unaffected.
+    """
+
+    def __init__(self,
+                 requests_per_second: Optional[float] = 1.0,
+                 per_host: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            requests_per_second: Default rate for any host (None or 0 disables limiting)
+            per_host: Optional overrides of requests per second keyed by host
+        """
+        self.default_interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.host_intervals = {
+            host: (1.0 / rate if rate else 0.0)
+            for host, rate in (per_host or {}).items()
+        }
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> float:
+        """
+        Block until a request to host is allowed.
+
+        Returns:
+            Number of seconds spent waiting
+        """
+        interval = self.host_intervals.get(host, self.default_interval)
+        if interval <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given in seconds or as an HTTP date.
+
+    Returns:
+        Seconds to wait, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+class AdaptiveRateLimiter:
+    """
+    Thread-safe token bucket whose rate adapts to the server's feedback.
+
+    Requests take a token from a bucket refilled at the current rate. A 429
+    halves the rate and pauses every caller until Retry-After has passed;
+    each successful response nudges the rate back up towards the configured
+    maximum. RapidAPI quota headers are honoured as well: when the remaining
+    request count reaches zero, callers wait for the advertised reset.
+    """
+
+    REMAINING_HEADER = "X-RateLimit-Requests-Remaining"
+    RESET_HEADER = "X-RateLimit-Requests-Reset"
+
+    def __init__(self,
+                 requests_per_second: float = 1.0,
+                 burst: int = 1,
+                 min_rate: float = 0.1,
+                 recovery: float = 0.1):
+        """
+        Args:
+            requests_per_second: Maximum (and starting) request rate
+            burst: Number of requests that may be sent back to back
+            min_rate: Floor the rate never drops below after repeated 429s
+            recovery: Fraction of the maximum rate regained per successful response
+        """
+        self.max_rate = requests_per_second
+        self.min_rate = min(min_rate, requests_per_second)
+        self.rate = requests_per_second
+        self.burst = max(burst, 1)
+        self.recovery = recovery
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "waited_seconds": 0.0}
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """
+        Block until a request may be sent.
+
+        Returns:
+            Number of seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    self.stats["requests"] += 1
+                    self.stats["waited_seconds"] += waited
+                    return waited
+                else:
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def on_success(self, headers: Optional[Mapping[str, str]] = None) -> None:
+        """Record a successful response, recovering rate and reading quota headers."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = min(self.max_rate, self.rate + self.recovery * self.max_rate)
+            if not headers:
+                return
+            try:
+                remaining = int(headers.get(self.REMAINING_HEADER, ""))
+                reset = float(headers.get(self.RESET_HEADER, ""))
+            except ValueError:
+                return
+            if remaining <= 0 and reset > 0:
+                self._paused_until = max(self._paused_until, now + reset)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Record a 429: halve the rate, drain the bucket and honour Retry-After."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.stats["throttled"] += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def report(self) -> str:
+        """Summarize limiter activity."""
+        stats = self.stats
+        return (
+            f"Rate limiter: {stats['requests']} requests, {stats['throttled']} throttled, "
+            f"{stats['waited_seconds']:.1f}s waiting, current rate {self.rate:.2f}/s"
+        )
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache for API responses.
+
+    Each entry is a JSON file named by the SHA-256 of its normalized request,
+    stored with its own TTL. Hits refresh the file's mtime, so evicting the
+    oldest mtimes once the directory exceeds max_bytes gives LRU behaviour.
+    Safe to share between threads of one process.
+    """
+
+    def __init__(self,
+                 cache_dir: Path,
+                 ttl_seconds: float = 24 * 60 * 60,
+                 max_bytes: int = 50 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: Directory holding the cache entries
+            ttl_seconds: Default time-to-live for new entries
+            max_bytes: Total size above which least recently used entries are evicted
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._total_bytes = sum(path.stat().st_size for path in self.cache_dir.glob("*.json"))
+
+    @staticmethod
+    def make_key(url: str, params: Dict[str, Any]) -> str:
+        """Hash a URL and querystring into a stable key, ignoring param order, case and spacing."""
+        normalized = {
+            str(name).strip().lower(): " ".join(str(value).split()).lower()
+            for name, value in params.items()
+            if value is not None
+        }
+        payload = json.dumps([url, sorted(normalized.items())], separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached response for key, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._count("misses")
+            return None
+
+        if time.time() - entry["created"] > entry["ttl"]:
+            self._count("expired")
+            self._remove(path)
+            return None
+
+        # Touch the entry so eviction treats it as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self._count("hits")
+        return entry["response"]
+
+    def set(self, key: str, response: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a response under key, then evict entries if over the size budget."""
+        entry = {
+            "created": time.time(),
+            "ttl": self.ttl_seconds if ttl_seconds is None else ttl_seconds,
+            "response": response
+        }
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        path = self._path(key)
+
+        with self._lock:
+            previous_size = path.stat().st_size if path.exists() else 0
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._total_bytes += len(data) - previous_size
+            self.stats["writes"] += 1
+            self._evict()
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _remove(self, path: Path) -> None:
+        with self._lock:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                self._total_bytes -= size
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until under max_bytes (lock must be held)."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        entries = sorted(self.cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in entries:
+            if self._total_bytes <= self.max_bytes:
+                break
+            size = path.stat().st_size
+            path.unlink()
+            self._total_bytes -= size
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Remove every cache entry."""
+        with self._lock:
+            for path in self.cache_dir.glob("*.json"):
+                path.unlink()
+            self._total_bytes = 0
+
+    def report(self) -> str:
+        """Summarize cache activity for this run."""
+        with self._lock:
+            stats = dict(self.stats)
+            total_bytes = self._total_bytes
+        return (
+            f"Response cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['expired']} expired, {stats['writes']} writes, "
+            f"{stats['evictions']} evictions, {total_bytes / 1024:.0f} KB on disk"
+        )
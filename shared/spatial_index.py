@@ -0,0 +1,159 @@
+import math
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from shared.atomic_write import atomic_write
+from shared.geodesy import haversine_miles
+
+# Bumped whenever the pickled layout changes so stale files are rebuilt
+INDEX_FORMAT_VERSION = 1
+
+class SpatialIndex:
+    """
+    Grid-bucket index of map points for bounding-box and radius queries.
+
+    Points are grouped into fixed-size lat/lon cells, so a query only looks
+    at the cells overlapping its box instead of every point. Each point
+    belongs to a layer (e.g. "hospitals", "jobs") and carries the record
+    dictionary it came from. Indexes are pickled to disk together with the
+    modification times of their source files, so an unchanged index reloads
+    without being rebuilt.
+    """
+
+    def __init__(self, cell_degrees: float = 0.05):
+        """
+        Args:
+            cell_degrees: Grid cell size in degrees (0.05 is roughly 3.5 miles)
+        """
+        self.cell_degrees = cell_degrees
+        self.points: List[Tuple[str, float, float, Dict]] = []
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        self.sources: Dict[str, float] = {}
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def add(self, layer: str, lat: float, lon: float, record: Dict) -> None:
+        """Add one point to the index."""
+        self.cells.setdefault(self._cell(lat, lon), []).append(len(self.points))
+        self.points.append((layer, lat, lon, record))
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def layer_counts(self) -> Dict[str, int]:
+        """Number of indexed points per layer."""
+        counts = {}
+        for layer, _, _, _ in self.points:
+            counts[layer] = counts.get(layer, 0) + 1
+        return counts
+
+    def _candidates(self, south: float, west: float, north: float, east: float) -> Iterable[int]:
+        min_row, min_col = self._cell(south, west)
+        max_row, max_col = self._cell(north, east)
+        if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self.cells):
+            # Box spans more cells than are occupied: walk the occupied ones instead
+            for (row, col), ids in self.cells.items():
+                if min_row <= row <= max_row and min_col <= col <= max_col:
+                    yield from ids
+            return
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                yield from self.cells.get((row, col), ())
+
+    def query_bbox(self,
+                   south: float,
+                   west: float,
+                   north: float,
+                   east: float,
+                   layers: Optional[Iterable[str]] = None,
+                   limit: Optional[int] = None) -> List[Tuple[str, float, float, Dict]]:
+        """
+        Return points inside a bounding box.
+
+        Args:
+            south, west, north, east: Box edges in degrees
+            layers: Only return points from these layers (default: all)
+            limit: Maximum number of points to return
+
+        Returns:
+            List of (layer, lat, lon, record) tuples
+        """
+        layers = set(layers) if layers else None
+        results = []
+        for point_id in self._candidates(south, west, north, east):
+            layer, lat, lon, record = self.points[point_id]
+            if layers is not None and layer not in layers:
+                continue
+            if south <= lat <= north and west <= lon <= east:
+                results.append(self.points[point_id])
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def query_radius(self,
+                     lat: float,
+                     lon: float,
+                     radius_miles: float,
+                     layers: Optional[Iterable[str]] = None,
+                     limit: Optional[int] = None) -> List[Tuple[float, str, float, float, Dict]]:
+        """
+        Return points within radius_miles of (lat, lon), nearest first.
+
+        Returns:
+            List of (distance_miles, layer, lat, lon, record) tuples
+        """
+        lat_delta = radius_miles / 69.0
+        lon_delta = radius_miles / (69.0 * max(math.cos(math.radians(lat)), 0.01))
+        results = []
+        for layer, point_lat, point_lon, record in self.query_bbox(
+                lat - lat_delta, lon - lon_delta, lat + lat_delta, lon + lon_delta, layers):
+            distance = haversine_miles(lat, lon, point_lat, point_lon)
+            if distance <= radius_miles:
+                results.append((distance, layer, point_lat, point_lon, record))
+        results.sort(key=lambda result: result[0])
+        return results[:limit] if limit is not None else results
+
+    @staticmethod
+    def source_mtimes(paths: Iterable[Path]) -> Dict[str, float]:
+        """Modification times of the given source files (missing files are skipped)."""
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[str(path)] = os.stat(path).st_mtime
+            except FileNotFoundError:
+                continue
+        return mtimes
+
+    def save(self, path: Path) -> None:
+        """Persist the index atomically."""
+        atomic_write(path, pickle.dumps((INDEX_FORMAT_VERSION, self.__dict__), protocol=pickle.HIGHEST_PROTOCOL))
+
+    @classmethod
+    def load(cls, path: Path, sources: Optional[Iterable[Path]] = None) -> Optional["SpatialIndex"]:
+        """
+        Load an index saved with save().
+
+        Args:
+            path: Index file
+            sources: If given, the index is only returned when these files are
+                unchanged since it was built
+
+        Returns:
+            The index, or None if it is missing, from another format version or stale
+        """
+        try:
+            with open(path, 'rb') as f:
+                version, state = pickle.load(f)
+        except (FileNotFoundError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if version != INDEX_FORMAT_VERSION:
+            return None
+
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        if sources is not None and index.sources != cls.source_mtimes(sources):
+            return None
+        return index